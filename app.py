@@ -1,17 +1,39 @@
 import os
-import sys
 import re
-import json
-import base64
-from pathlib import Path
-from urllib.parse import quote, unquote, urljoin, urlparse
-from fastapi import FastAPI, Request, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
+import ssl
+import gzip
+import hashlib
+import http.cookiejar
+import logging
+import logging.handlers
+import queue
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from urllib.parse import unquote, urljoin, urlsplit
+from typing import List, Optional
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
+import orjson
 import asyncio
-import brotli
+from markupsafe import escape
 
-app = FastAPI(title="Proxy Browser V2 - CroxyProxy Style")
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_SUPPORT = os.environ.get("UPSTREAM_HTTP2", "true").lower() != "false"
+except ImportError:
+    HTTP2_SUPPORT = False
+
+try:
+    import hyperscan
+    HYPERSCAN_SUPPORT = True
+except ImportError:
+    HYPERSCAN_SUPPORT = False
+
+logger = logging.getLogger(__name__)
 
 # Proxy configuration
 PROXY_CONFIG = {
@@ -23,12 +45,382 @@ PROXY_CONFIG = {
     "language": os.environ.get("SPOOF_LANGUAGE", "en-US"),
     "target_url": os.environ.get("DEFAULT_TARGET_URL", "https://ybsq.xyz/")
 }
+PROXY_URL = f"http://{PROXY_CONFIG['username']}:{PROXY_CONFIG['password']}@{PROXY_CONFIG['server']}"
+
+# Shared upstream connection pool size
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", 1000))
+UPSTREAM_MAX_KEEPALIVE = int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", 100))
+# Upstream requests allowed to wait on response headers at once; the rest
+# queue here. A permit covers the request up to its headers only: bodies
+# read or streamed afterwards keep their pooled connection outside the
+# limit, so a pool full of streaming bodies can still make a new request
+# wait for a connection
+UPSTREAM_CONCURRENCY = min(int(os.environ.get("UPSTREAM_CONCURRENCY", 200)), UPSTREAM_MAX_CONNECTIONS)
+
+# One TLS context for every upstream connection (httpx would otherwise build
+# one per proxy mount). Certificates stay unverified as before; httpcore sets
+# the ALPN protocols on it per connection
+UPSTREAM_SSL_CONTEXT = ssl.create_default_context()
+UPSTREAM_SSL_CONTEXT.check_hostname = False
+UPSTREAM_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+UPSTREAM_SSL_CONTEXT.minimum_version = ssl.TLSVersion.TLSv1_2
 
 # Global variable to store actual proxy IP
 CURRENT_PROXY_IP = None
+# IP echo services raced to detect it (URL, JSON field holding the IP)
+PROXY_IP_SERVICES = (
+    ("https://httpbin.org/ip", "origin"),
+    ("https://api.ipify.org?format=json", "ip"),
+    ("https://ipinfo.io/json", "ip"),
+)
+
+# URL rewriting patterns - compiled once at import instead of per response
+# Root-relative URL attributes (quoted or bare), srcset lists and the <head>
+# tag (attributes included) as injection point, matched in one pass over the
+# raw HTML bytes. Names are case-insensitive and may have spaces around "=",
+# as HTML allows
+HTML_REWRITE_RE = re.compile(
+    rb'(?P<attr>href|src|action|poster)\s*=\s*(?:(?P<quote>["\'])(?P<url>/[^"\']*)(?P=quote)|(?P<bare>/[^\s"\'>]*))'
+    rb'|srcset\s*=\s*(?P<srcset_quote>["\'])(?P<srcset>[^"\']*)(?P=srcset_quote)'
+    rb'|<head\b[^>]*>',
+    re.IGNORECASE
+)
+# Fallback injection point for pages without a <head> tag
+HTML_OPEN_RE = re.compile(rb'<html\b[^>]*>', re.IGNORECASE)
+CSS_URL_RE = re.compile(rb'url\(["\']?([^"\'\\)]+)["\']?\)')
+# Any "scheme:" prefix (http:, data:, blob:, ...) marks an absolute CSS url()
+CSS_SCHEME_RE = re.compile(rb'[a-zA-Z][a-zA-Z0-9+.-]*:')
+# Server-side IP/location scrubbing of proxied HTML (bytes)
+LOCATION_REPLACEMENTS = {
+    b'India': b'United States',
+    b'Bhubaneswar': b'New York',
+    b'Odisha': b'New York',
+    b'Khordha': b'New York',
+    b'Asia/Calcutta': b'America/New_York',
+    b'en-GB': b'en-US',
+    b'Bharti Airtel Limited': b'DigitalOcean, LLC',
+    b'Bharti Airtel': b'DigitalOcean LLC',
+    b'AS45609': b'AS14061',
+}
+# IPv6, IPv4 and location/ISP names fused into one alternation so the
+# document is walked once; longer names first so "Bharti Airtel Limited"
+# wins over "Bharti Airtel"
+SCRUB_RE = re.compile(
+    rb'\b(?:(?P<ipv6>[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4}){7})'
+    rb'|(?P<ipv4>(?:[0-9]{1,3}\.){3}[0-9]{1,3})'
+    rb'|(?P<location>' + b'|'.join(map(re.escape, LOCATION_REPLACEMENTS)) + rb'))\b'
+)
+# Loose superset of SCRUB_RE's IP alternatives: it starts with a character
+# class, so the engine can skip ahead instead of trying the \b alternation at
+# every offset. No hit (and no location name) means there is nothing to scrub
+SCRUB_HINT_RE = re.compile(
+    rb'[0-9]\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]'
+    rb'|:[0-9a-fA-F]{1,4}:[0-9a-fA-F]{1,4}:[0-9a-fA-F]{1,4}:[0-9a-fA-F]{1,4}:[0-9a-fA-F]{1,4}:[0-9a-fA-F]{1,4}:'
+)
+# Same patterns as a Hyperscan database (one id per pattern) when available;
+# a None replacement means "the current proxy IP"
+SCRUB_DB = None
+SCRUB_DB_REPLACEMENTS = [None, None] + list(LOCATION_REPLACEMENTS.values())
+if HYPERSCAN_SUPPORT:
+    scrub_expressions = [
+        rb'\b[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4}){7}\b',
+        rb'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
+    ] + [rb'\b' + re.escape(name) + rb'\b' for name in LOCATION_REPLACEMENTS]
+    SCRUB_DB = hyperscan.Database()
+    SCRUB_DB.compile(
+        expressions=scrub_expressions,
+        ids=list(range(len(scrub_expressions))),
+        elements=len(scrub_expressions),
+        flags=hyperscan.HS_FLAG_SOM_LEFTMOST
+    )
+# Literal (lowercase) starts of every HTML_REWRITE_RE match; "src" also covers srcset
+REWRITE_NEEDLES = (b'href', b'src', b'action', b'poster', b'<head')
+# Prefixes every HTML_REWRITE_RE match starts with, as a Hyperscan database:
+# it finds the candidate offsets, HTML_REWRITE_RE is only run anchored there
+# (Hyperscan has no backreferences or capture groups)
+REWRITE_DB = None
+if HYPERSCAN_SUPPORT:
+    rewrite_expressions = [
+        rb'(?:href|src|action|poster)\s*=\s*["\']?/',
+        rb'srcset\s*=\s*["\']',
+        rb'<head\b',
+    ]
+    REWRITE_DB = hyperscan.Database()
+    REWRITE_DB.compile(
+        expressions=rewrite_expressions,
+        ids=list(range(len(rewrite_expressions))),
+        elements=len(rewrite_expressions),
+        flags=hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST
+    )
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# JSON bodies larger than this are pretty-printed off the event loop
+JSON_INLINE_LIMIT = int(os.environ.get("JSON_INLINE_LIMIT", 256 * 1024))
+
+# Rewritten proxy responses kept in memory (entries, default seconds to live)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+# Cached bodies at least this large also keep a gzip-encoded copy
+GZIP_MIN_SIZE = 1024
+# Larger bodies are served but not kept, so the cache stays small in memory
+RESPONSE_CACHE_MAX_BODY = int(os.environ.get("RESPONSE_CACHE_MAX_BODY", 1024 * 1024))
+# Total body bytes (gzip copies included) the cache may hold; the entry
+# count alone would allow RESPONSE_CACHE_SIZE full-size bodies
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+class ResponseCache:
+    """Bounded LRU of ready-to-send responses with a per-entry expiry, capped
+    both by entry count and by the summed size of the entries"""
+    
+    def __init__(self, maxsize: int, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value, ttl: int, size: int = 0):
+        self._discard(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.nbytes += size
+        while len(self._entries) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+    
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES)
+
+# Futures for upstream fetches currently in flight, keyed like RESPONSE_CACHE
+INFLIGHT_REQUESTS = {}
+
+def get_cache_ttl(upstream: httpx.Response):
+    """Seconds an upstream response may be reused for, or None if it must not be cached"""
+    if upstream.status_code != 200 or 'set-cookie' in upstream.headers:
+        return None
+    # Entries are keyed by URL only, so a body negotiated on anything but
+    # the encoding (e.g. WebP/AVIF picked by Accept) must not be shared
+    vary = upstream.headers.get('vary')
+    if vary and any(field.strip() not in ('', 'accept-encoding') for field in vary.lower().split(',')):
+        return None
+    cache_control = upstream.headers.get('cache-control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control or 'private' in cache_control:
+        return None
+    max_age = MAX_AGE_RE.search(cache_control)
+    if max_age:
+        return int(max_age.group(1)) or None
+    return RESPONSE_CACHE_TTL
+
+def gzip_response(proxied: Response):
+    """Gzip-encoded copy of a buffered response, or None when too small to bother"""
+    if len(proxied.body) < GZIP_MIN_SIZE:
+        return None
+    headers = {name: value for name, value in proxied.headers.items() if name != 'content-length'}
+    headers["Content-Encoding"] = "gzip"
+    headers["Vary"] = "Accept-Encoding"
+    return Response(
+        content=gzip.compress(proxied.body, compresslevel=1),
+        status_code=proxied.status_code,
+        headers=headers
+    )
+
+def cache_proxied_response(key, proxied: Response, upstream: httpx.Response, compressible: bool = True):
+    """Store a rewritten response when the request and upstream headers allow it"""
+    if key is not None and len(proxied.body) <= RESPONSE_CACHE_MAX_BODY:
+        ttl = get_cache_ttl(upstream)
+        if ttl:
+            # Compressed once here, so repeat hits cost no CPU and less bandwidth
+            gzipped = gzip_response(proxied) if compressible else None
+            size = len(proxied.body) + (len(gzipped.body) if gzipped is not None else 0)
+            RESPONSE_CACHE.set(key, (proxied, gzipped), ttl, size)
+    return proxied
+
+def proxied_url(proxy_base: bytes, origin: bytes, url: bytes):
+    """Absolute proxy URL for a root-relative attribute value of a page on origin"""
+    if url.startswith(b'//') or b'/.' in url:
+        return proxy_base + b'/' + resolve_url(origin, url)
+    # Root-relative: the page's path plays no part, so no urljoin needed
+    return proxy_base + b'/' + origin + url
+
+@lru_cache(maxsize=4096)
+def resolve_url(origin: bytes, url: bytes):
+    """urljoin for protocol-relative and dot-segment URLs; undecodable bytes pass through"""
+    return urljoin(origin.decode('utf-8', 'surrogateescape') + '/', url.decode('utf-8', 'surrogateescape')).encode('utf-8', 'surrogateescape')
 
-def get_proxy_url():
-    return f"http://{PROXY_CONFIG['username']}:{PROXY_CONFIG['password']}@{PROXY_CONFIG['server']}"
+def rewrite_srcset(srcset: bytes, origin: bytes, proxy_base: bytes):
+    """Proxy the root-relative candidates of a srcset list, keeping their descriptors"""
+    candidates = []
+    for candidate in srcset.split(b','):
+        url, _, descriptor = candidate.strip().partition(b' ')
+        if url.startswith(b'/') and not url.startswith(b'//'):
+            url = proxied_url(proxy_base, origin, url)
+        candidates.append(url + b' ' + descriptor if descriptor else url)
+    return b', '.join(candidates)
+
+def rewrite_css_url(url: bytes, stylesheet: str, origin: bytes, proxy_base: bytes):
+    """Proxy URL for a url() value of a stylesheet, or None to leave it as written"""
+    url = url.strip()
+    if not url or url.startswith((b'#', proxy_base)):
+        return None
+    if url.startswith(b'/'):
+        return proxied_url(proxy_base, origin, url)
+    if CSS_SCHEME_RE.match(url):
+        # data:, blob: and the like are left alone; http(s) goes through us
+        if url[:8].lower().startswith((b'http://', b'https://')):
+            return proxy_base + b'/' + url
+        return None
+    # Relative to the stylesheet itself, not to the page that links it
+    return proxy_base + b'/' + urljoin(stylesheet, url.decode('utf-8', 'surrogateescape')).encode('utf-8', 'surrogateescape')
+
+def format_json(body: bytes):
+    """Indented, HTML-escaped rendering of a JSON body"""
+    return escape(orjson.dumps(orjson.loads(body), option=orjson.OPT_INDENT_2).decode())
+
+def scrub_html(data: bytes, proxy_ip: str):
+    """Replace IPs and location/ISP names in a UTF-8 body, with Hyperscan when installed"""
+    ip = proxy_ip.encode()
+    if SCRUB_DB is None:
+        # Most pages carry no IPs or location names at all: two cheap scans
+        # instead of a full regex walk and copy of the body
+        if not SCRUB_HINT_RE.search(data) and not any(name in data for name in LOCATION_REPLACEMENTS):
+            return data
+        def scrub_match(m):
+            if m.lastgroup == 'location':
+                return LOCATION_REPLACEMENTS[m.group('location')]
+            return ip
+        return SCRUB_RE.sub(scrub_match, data)
+    
+    spans = []
+    def on_match(pattern_id, start, end, flags, context):
+        spans.append((start, -end, pattern_id))
+    SCRUB_DB.scan(data, match_event_handler=on_match)
+    if not spans:
+        return data
+    
+    # Hyperscan reports every match; keep the leftmost-longest, non-overlapping ones
+    spans.sort()
+    parts = []
+    pos = 0
+    for start, neg_end, pattern_id in spans:
+        if start < pos:
+            continue
+        parts.append(data[pos:start])
+        parts.append(SCRUB_DB_REPLACEMENTS[pattern_id] or ip)
+        pos = -neg_end
+    parts.append(data[pos:])
+    return b''.join(parts)
+
+def rewrite_html(data: bytes, rewrite_match):
+    """HTML_REWRITE_RE.sub(rewrite_match, data), with the candidate offsets
+    found by Hyperscan when installed, else by bytes.find on a lowercased copy"""
+    starts = set()
+    if REWRITE_DB is not None:
+        def on_match(pattern_id, start, end, flags, context):
+            starts.add(start)
+        REWRITE_DB.scan(data, match_event_handler=on_match)
+    else:
+        # The regex tries its alternation at every offset; these C-level
+        # literal searches only stop where a match can start
+        lowered = data.lower()
+        for needle in REWRITE_NEEDLES:
+            start = lowered.find(needle)
+            while start != -1:
+                starts.add(start)
+                start = lowered.find(needle, start + 1)
+    if not starts:
+        return data
+    
+    # Same leftmost, non-overlapping walk re.sub does, but only at candidate offsets
+    parts = []
+    pos = 0
+    for start in sorted(starts):
+        if start < pos:
+            continue
+        m = HTML_REWRITE_RE.match(data, start)
+        if m is None:
+            continue
+        parts.append(data[pos:start])
+        parts.append(rewrite_match(m))
+        pos = m.end()
+    parts.append(data[pos:])
+    return b''.join(parts)
+
+def start_log_listener():
+    """Route this module's records through a queue so stream writes happen on a
+    background thread instead of blocking the event loop; returns the listener
+    and the handler to remove on shutdown"""
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    listener.start()
+    return listener, queue_handler
+
+def create_upstream_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Build the pooled client that every upstream fetch goes through"""
+    return httpx.AsyncClient(
+        # A mock transport (tests) talks to nothing, so it must not be
+        # shadowed by the proxy mounts
+        proxies=None if transport else {"http://": PROXY_URL, "https://": PROXY_URL},
+        transport=transport,
+        # The client is shared by every visitor; a jar that refuses all cookies
+        # keeps one user's upstream Set-Cookie from reaching the next user
+        cookies=http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])),
+        # Fail fast when the upstream proxy is unreachable, but give slow
+        # origins the full 30s to answer
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        verify=UPSTREAM_SSL_CONTEXT,
+        http2=HTTP2_SUPPORT,  # multiplex concurrent subresource fetches per origin
+        limits=httpx.Limits(
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            keepalive_expiry=30
+        )
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one pooled upstream client for the whole process and close it on shutdown"""
+    log_listener, log_handler = start_log_listener()
+    if not HTTP2_SUPPORT:
+        logger.warning("⚠️ HTTP/2 disabled: upstream fetches use HTTP/1.1 connections (install httpx[http2])")
+    app.state.http_client = create_upstream_client()
+    app.state.upstream_semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+    yield
+    await app.state.http_client.aclose()
+    # Detach the handler too, or every restart would log each record once more
+    logger.removeHandler(log_handler)
+    log_listener.stop()
+
+app = FastAPI(
+    title="Proxy Browser V2 - CroxyProxy Style",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # dict-returning routes serialize with orjson
+)
+
+async def lookup_proxy_ip(url: str, field: str):
+    """Ask one IP echo service which address our upstream proxy exits from"""
+    async with app.state.upstream_semaphore:
+        response = await app.state.http_client.get(url, timeout=10.0)
+    response.raise_for_status()
+    return response.json().get(field, "").split(",")[0].strip()
 
 async def get_actual_proxy_ip():
     """Get the actual IP address from our proxy"""
@@ -37,500 +429,536 @@ async def get_actual_proxy_ip():
     if CURRENT_PROXY_IP:
         return CURRENT_PROXY_IP
     
+    # Query all services at once and keep the first usable answer, so one
+    # slow or down service doesn't hold up the first proxied page
+    lookups = [asyncio.create_task(lookup_proxy_ip(url, field)) for url, field in PROXY_IP_SERVICES]
     try:
-        proxy_url = get_proxy_url()
-        async with httpx.AsyncClient(
-            proxies={"http://": proxy_url, "https://": proxy_url},
-            timeout=10.0,
-            verify=False
-        ) as client:
-            # Get IP from httpbin
-            response = await client.get("https://httpbin.org/ip")
-            if response.status_code == 200:
-                ip_data = response.json()
-                CURRENT_PROXY_IP = ip_data.get("origin", "").split(",")[0].strip()
-                print(f"🌐 PROXY: Detected actual proxy IP: {CURRENT_PROXY_IP}")
+        for lookup in asyncio.as_completed(lookups):
+            try:
+                proxy_ip = await lookup
+            except Exception as e:
+                logger.warning("❌ Failed to get proxy IP: %s", e)
+                continue
+            if proxy_ip:
+                CURRENT_PROXY_IP = proxy_ip
+                logger.info("🌐 PROXY: Detected actual proxy IP: %s", CURRENT_PROXY_IP)
                 return CURRENT_PROXY_IP
-    except Exception as e:
-        print(f"❌ Failed to get proxy IP: {e}")
+    finally:
+        for lookup in lookups:
+            lookup.cancel()
     
     # Fallback IP
     CURRENT_PROXY_IP = "8.8.8.8"
     return CURRENT_PROXY_IP
 
+# Headers sent with every rewritten HTML page
+HTML_PROXY_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "X-Frame-Options": "ALLOWALL",
+    "Content-Security-Policy": "default-src * 'unsafe-inline' 'unsafe-eval' data: blob:;"
+}
+
+# Incoming headers that are never forwarded upstream
+DROPPED_REQUEST_HEADERS = frozenset(['host', 'connection', 'content-length', 'transfer-encoding', 'user-agent'])
+
+# US location headers that don't depend on the request, built once at import
+STATIC_SPOOF_HEADERS = {
+    # CRITICAL: Force US User-Agent for better ad targeting
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "CF-IPCountry": "US",
+    "CF-Region": "NY",
+    "CF-City": "New York",
+    "X-Forwarded-Proto": "https",
+    "X-Appengine-Country": "US",
+    "X-Appengine-Region": "ny",
+    "X-Appengine-City": "newyork",
+    "X-ISP": "DigitalOcean, LLC",
+    "X-ASN": "AS14061",
+    "X-Organization": "DigitalOcean, LLC",
+    "Accept-Encoding": "gzip, deflate, br",  # br is decoded by httpx via the brotli package
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache"
+}
+
+# Request headers that carry the client IP, all set to the proxy's IP
+SPOOF_IP_HEADER_NAMES = (
+    "X-Forwarded-For", "X-Real-IP", "X-Appengine-User-IP", "X-Client-IP",
+    "X-Cluster-Client-IP", "X-Original-Forwarded-For", "True-Client-IP",
+    "X-Remote-IP", "X-Remote-Addr", "Remote-Addr", "HTTP_X_FORWARDED_FOR",
+    "HTTP_CLIENT_IP", "HTTP_X_REAL_IP"
+)
+# Browser headers replaced by spoofed ones, so the upstream never sees both
+# versions; kept as lowercase bytes to filter request.headers.raw directly
+OVERRIDDEN_REQUEST_HEADERS = frozenset(
+    name.lower().encode('latin-1') for name in (
+        *DROPPED_REQUEST_HEADERS, *STATIC_SPOOF_HEADERS, *SPOOF_IP_HEADER_NAMES,
+        "Forwarded", "X-Forwarded-Host", "X-Original-Host"
+    )
+)
+
+@lru_cache(maxsize=8)
+def get_ip_spoof_headers(proxy_ip: str):
+    """Static spoof headers plus the IP headers for one proxy IP, pre-encoded
+    as (name, value) byte pairs that httpx takes without re-normalising"""
+    headers = dict(STATIC_SPOOF_HEADERS)
+    headers.update(dict.fromkeys(SPOOF_IP_HEADER_NAMES, proxy_ip))
+    return tuple((name.encode('latin-1'), value.encode('latin-1')) for name, value in headers.items())
+
+@lru_cache(maxsize=1024)
+def get_host_spoof_headers(proxy_ip: str, netloc: str):
+    """Forwarded/Host headers for one target host, pre-encoded like get_ip_spoof_headers"""
+    host = netloc.encode('latin-1')
+    return (
+        (b"Forwarded", b"for=" + proxy_ip.encode('latin-1') + b";proto=https;host=" + host),
+        (b"X-Forwarded-Host", host),
+        (b"X-Original-Host", host),
+        (b"Host", host)
+    )
+
 async def get_spoofed_headers(original_request: Request, target_url: str):
     """Get headers with US location spoofing while preserving original User-Agent"""
-    headers = {}
-    
     # Get actual proxy IP dynamically
     proxy_ip = await get_actual_proxy_ip()
     
-    # Preserve original headers but modify location-related ones
-    for name, value in original_request.headers.items():
-        if name.lower() not in ['host', 'connection', 'content-length', 'transfer-encoding', 'user-agent']:
-            headers[name] = value
-    
-    # CRITICAL: Force US User-Agent for better ad targeting
-    headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    # Preserve original headers (raw bytes, no decode/encode round trip) but
+    # drop the location-related ones
+    headers = [
+        (name, value) for name, value in original_request.headers.raw
+        if name not in OVERRIDDEN_REQUEST_HEADERS
+    ]
     
     # Override location-related headers with US data using dynamic proxy IP
-    headers.update({
-        "Accept-Language": "en-US,en;q=0.9",
-        "X-Forwarded-For": proxy_ip,
-        "CF-IPCountry": "US", 
-        "CF-Region": "NY",
-        "CF-City": "New York",
-        "X-Real-IP": proxy_ip,
-        "X-Forwarded-Proto": "https",
-        "X-Appengine-Country": "US",
-        "X-Appengine-Region": "ny", 
-        "X-Appengine-City": "newyork",
-        "X-Appengine-User-IP": proxy_ip,
-        "X-Client-IP": proxy_ip,
-        "X-Cluster-Client-IP": proxy_ip,
-        "X-Original-Forwarded-For": proxy_ip,
-        "True-Client-IP": proxy_ip,
-        "X-Remote-IP": proxy_ip,
-        "X-Remote-Addr": proxy_ip,
-        "Remote-Addr": proxy_ip,
-        "HTTP_X_FORWARDED_FOR": proxy_ip,
-        "HTTP_CLIENT_IP": proxy_ip,
-        "HTTP_X_REAL_IP": proxy_ip,
-        "Forwarded": f"for={proxy_ip};proto=https;host={urlparse(target_url).netloc}",
-        "X-Forwarded-Host": urlparse(target_url).netloc,
-        "X-Original-Host": urlparse(target_url).netloc,
-        "Host": urlparse(target_url).netloc,
-        "X-ISP": "DigitalOcean, LLC",
-        "X-ASN": "AS14061",
-        "X-Organization": "DigitalOcean, LLC",
-        "Accept-Encoding": "gzip, deflate",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache"
-    })
+    headers.extend(get_ip_spoof_headers(proxy_ip))
+    headers.extend(get_host_spoof_headers(proxy_ip, urlsplit(target_url).netloc))
     
     return headers
 
-def rewrite_html_content(content: str, base_url: str, proxy_base: str, proxy_ip: str = "8.8.8.8"):
-    """Rewrite HTML content like CroxyProxy"""
-    
-    # Parse base URL
-    parsed_base = urlparse(base_url)
-    domain = f"{parsed_base.scheme}://{parsed_base.netloc}"
-    
-    # CroxyProxy-style URL rewriting (same domain approach)
-    import base64
-    
-    # Rewrite absolute URLs with Base64 encoding
-    def encode_url(match):
-        attr, quote, url = match.groups()
-        if url.startswith(('mailto:', 'tel:', 'javascript:', '#')):
-            return match.group(0)
-        
-        # Encode URL like CroxyProxy
-        if url.startswith('http'):
-            encoded = base64.b64encode(url.encode()).decode()
-            return f'{attr}={quote}/?url={encoded}{quote}'
-        return match.group(0)
-    
-    content = re.sub(
-        r'(href|src|action)=(["\'])(https?://[^"\']+)\2',
-        encode_url,
-        content
-    )
-    
-    # Rewrite protocol-relative URLs
-    content = re.sub(
-        r'(href|src|action)=(["\'])//([^"\']+)\2',
-        lambda m: f'{m.group(1)}={m.group(2)}/?url={base64.b64encode(f"https://{m.group(3)}".encode()).decode()}{m.group(2)}',
-        content
-    )
-    
-    # Rewrite relative URLs to stay on same domain
-    content = re.sub(
-        r'(href|src|action)=(["\'])(?!http|//|#|mailto:|tel:|javascript:|/\?)([^"\']+)\2',
-        lambda m: f'{m.group(1)}={m.group(2)}/?url={base64.b64encode(f"{domain}/{m.group(3)}".encode()).decode()}{m.group(2)}',
-        content
-    )
-    
-    # Add comprehensive spoofing script
-    spoof_script = f"""
+# Scripts injected into proxied HTML, built (and encoded) once instead of per request
+ISP_OVERRIDE_SCRIPT = '''
+<script>
+// Override ISP detection
+Object.defineProperty(window, 'userISP', {value: 'DigitalOcean, LLC', writable: false});
+Object.defineProperty(window, 'userOrganization', {value: 'DigitalOcean, LLC', writable: false});
+Object.defineProperty(window, 'userASN', {value: 'AS14061', writable: false});
+Object.defineProperty(window, 'userCountryCode', {value: 'US', writable: false});
+Object.defineProperty(window, 'userRegionCode', {value: 'NY', writable: false});
+
+// Override any ISP detection functions
+if (window.getISP) window.getISP = () => 'DigitalOcean, LLC';
+if (window.getOrganization) window.getOrganization = () => 'DigitalOcean, LLC';
+if (window.getASN) window.getASN = () => 'AS14061';
+
+console.log('🇺🇸 ISP: Forced DigitalOcean ISP data');
+</script>
+'''.encode()
+
+# AdSense domain fix
+ADSENSE_FIX_SCRIPT = '''
+<script>
+// Dynamic Domain Detection - Works with ANY domain
+const currentPath = window.location.pathname;
+let originalDomain, originalOrigin;
+
+// Extract target domain from proxy URL
+if (currentPath.includes('/proxy/https://')) {
+    const targetUrl = currentPath.replace('/proxy/https%3A//', '').replace('/proxy/https://', '');
+    originalDomain = targetUrl.split('/')[0];
+    originalOrigin = 'https://' + originalDomain;
+} else if (currentPath.includes('/proxy/http://')) {
+    const targetUrl = currentPath.replace('/proxy/http%3A//', '').replace('/proxy/http://', '');
+    originalDomain = targetUrl.split('/')[0];
+    originalOrigin = 'http://' + originalDomain;
+} else {
+    // Fallback for Base64 URLs - decode from URL parameter
+    const urlParams = new URLSearchParams(window.location.search);
+    const encodedUrl = urlParams.get('url');
+    if (encodedUrl) {
+        try {
+            const decodedUrl = atob(encodedUrl);
+            const url = new URL(decodedUrl);
+            originalDomain = url.hostname;
+            originalOrigin = url.origin;
+        } catch(e) {
+            originalDomain = 'example.com';
+            originalOrigin = 'https://example.com';
+        }
+    } else {
+        originalDomain = 'example.com';
+        originalOrigin = 'https://example.com';
+    }
+}
+
+console.log(`🎯 DYNAMIC: Detected target domain: ${originalDomain}`);
+console.log(`🎯 DYNAMIC: Detected target origin: ${originalOrigin}`);
+
+// Override document properties
+Object.defineProperty(document, 'domain', {
+    get: function() { 
+        console.log(`📢 ADSENSE: Spoofed document.domain to ${originalDomain}`);
+        return originalDomain; 
+    },
+    set: function() { /* ignore */ }
+});
+
+Object.defineProperty(document, 'URL', {
+    get: function() { 
+        const cleanPath = window.location.pathname.replace(`/proxy/https://${originalDomain}`, '').replace(`/proxy/http://${originalDomain}`, '') || '/';
+        return originalOrigin + cleanPath + window.location.search;
+    }
+});
+
+Object.defineProperty(document, 'documentURI', {
+    get: function() { 
+        const cleanPath = window.location.pathname.replace(`/proxy/https://${originalDomain}`, '').replace(`/proxy/http://${originalDomain}`, '') || '/';
+        return originalOrigin + cleanPath + window.location.search;
+    }
+});
+
+// Override window.location properties
+Object.defineProperty(window.location, 'hostname', {
+    get: function() { 
+        console.log(`📢 ADSENSE: Spoofed location.hostname to ${originalDomain}`);
+        return originalDomain; 
+    }
+});
+
+Object.defineProperty(window.location, 'host', {
+    get: function() { return originalDomain; }
+});
+
+Object.defineProperty(window.location, 'origin', {
+    get: function() { 
+        console.log(`📢 ADSENSE: Spoofed location.origin to ${originalOrigin}`);
+        return originalOrigin; 
+    }
+});
+
+Object.defineProperty(window.location, 'href', {
+    get: function() { 
+        const cleanPath = window.location.pathname.replace(`/proxy/https://${originalDomain}`, '').replace(`/proxy/http://${originalDomain}`, '') || '/';
+        return originalOrigin + cleanPath + window.location.search;
+    }
+});
+
+// Override document.referrer for AdSense
+Object.defineProperty(document, 'referrer', {
+    get: function() { 
+        console.log(`📢 ADSENSE: Spoofed document.referrer to ${originalDomain}`);
+        return originalOrigin + '/'; 
+    }
+});
+
+// Override top.location for iframe ads
+try {
+    Object.defineProperty(top.location, 'hostname', {
+        get: function() { return originalDomain; }
+    });
+    Object.defineProperty(top.location, 'origin', {
+        get: function() { return originalOrigin; }
+    });
+} catch(e) { /* ignore cross-origin */ }
+
+console.log(`📢 ADSENSE: Domain spoofed to ${originalDomain}`);
+</script>
+'''.encode()
+
+# GA4 location override, must run before any GA4 scripts
+GA4_OVERRIDE_SCRIPT = '''
+<script>
+// GA4 Location Override - Must run before GA4 loads
+window.dataLayer = window.dataLayer || [];
+function gtag(){dataLayer.push(arguments);}
+
+// Override gtag to force US location
+const originalGtag = window.gtag || gtag;
+window.gtag = function(command, target, config) {
+    if (command === 'config' && config) {
+        config.country = 'US';
+        config.region = 'NY'; 
+        config.city = 'New York';
+        config.custom_map = config.custom_map || {};
+        config.custom_map.country = 'US';
+        config.custom_map.region = 'NY';
+        config.custom_map.city = 'New York';
+        console.log('🇺🇸 GA4: Forced US location in config');
+    }
+    return originalGtag.call(this, command, target, config);
+};
+
+// Set global location data for GA4
+gtag('config', 'G-BX28RFEZ30', {
+    country: 'US',
+    region: 'NY',
+    city: 'New York',
+    custom_map: {
+        country: 'US',
+        region: 'NY',
+        city: 'New York'
+    }
+});
+</script>
+'''.encode()
+
+@lru_cache(maxsize=8)
+def get_ip_blocking_script(current_proxy_ip: str):
+    """Client-side IP detection blocking for one proxy IP (rebuilt only when the IP changes)"""
+    return f'''
     <script>
-    // CroxyProxy-style spoofing
-    console.log('🇺🇸 CROXYPROXY: Initializing location spoofing...');
-    
-    // Block WebRTC completely to prevent IP leaks
-    console.log('🇺🇸 CROXYPROXY: Disabling WebRTC completely');
-    
-    // Disable RTCPeerConnection
-    delete window.RTCPeerConnection;
-    delete window.webkitRTCPeerConnection;
-    delete window.mozRTCPeerConnection;
-    
-    // Override with null functions
-    window.RTCPeerConnection = function() {{
-        console.log('🚫 WEBRTC: Blocked RTCPeerConnection creation');
-        throw new Error('WebRTC is disabled for privacy');
-    }};
-    
-    window.webkitRTCPeerConnection = window.RTCPeerConnection;
-    window.mozRTCPeerConnection = window.RTCPeerConnection;
-    
-    // Block getUserMedia as well
-    if (navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {{
-        navigator.mediaDevices.getUserMedia = function() {{
-            console.log('🚫 WEBRTC: Blocked getUserMedia');
-            return Promise.reject(new Error('getUserMedia is disabled for privacy'));
-        }};
-    }}
-    
-    if (navigator.getUserMedia) {{
-        navigator.getUserMedia = function() {{
-            console.log('🚫 WEBRTC: Blocked getUserMedia (legacy)');
-        }};
-    }}
-    
-    // Override geolocation
-    if (navigator.geolocation) {{
-        const fakePosition = {{
-            coords: {{
-                latitude: 40.7128,
-                longitude: -74.0060,
-                accuracy: 10,
-                altitude: null,
-                altitudeAccuracy: null,
-                heading: null,
-                speed: null
-            }},
-            timestamp: Date.now()
-        }};
-        
-        navigator.geolocation.getCurrentPosition = function(success, error, options) {{
-            console.log('🇺🇸 CROXYPROXY: Spoofing getCurrentPosition');
-            if (success) setTimeout(() => success(fakePosition), 100);
-        }};
-        
-        navigator.geolocation.watchPosition = function(success, error, options) {{
-            console.log('🇺🇸 CROXYPROXY: Spoofing watchPosition');
-            if (success) setTimeout(() => success(fakePosition), 100);
-            return 1;
+    // COMPLETE IP DETECTION BLOCKING - CroxyProxy Level
+    console.log('🚫 CROXYPROXY: BLOCKING ALL IP DETECTION');
+
+    (function() {{
+        'use strict';
+
+        const SPOOF_IP = "{current_proxy_ip}";
+        const SPOOF_DATA = {{
+            ip: SPOOF_IP,
+            country: "United States", 
+            countryCode: "US",
+            region: "NY",
+            regionName: "New York",
+            city: "New York",
+            timezone: "America/New_York",
+            lat: 40.7128,
+            lon: -74.0060,
+            isp: "DigitalOcean, LLC",
+            org: "DigitalOcean, LLC",
+            as: "AS14061"
         }};
-    }}
-    
-    // Override timezone (comprehensive)
-    Date.prototype.getTimezoneOffset = function() {{
-        console.log('🇺🇸 CROXYPROXY: Spoofing timezone offset');
-        return 300; // EST (-5 UTC)
-    }};
-    
-    // Override Date toString to show EST
-    const originalToString = Date.prototype.toString;
-    Date.prototype.toString = function() {{
-        const date = originalToString.call(this);
-        return date.replace(/GMT[+-]\\d{{4}}.*$/, 'GMT-0500 (Eastern Standard Time)');
-    }};
-    
-    // Override Intl DateTimeFormat
-    const originalDateTimeFormat = Intl.DateTimeFormat;
-    Intl.DateTimeFormat = function(locale, options) {{
-        console.log('🇺🇸 CROXYPROXY: Spoofing DateTimeFormat');
-        return new originalDateTimeFormat('en-US', {{...options, timeZone: 'America/New_York'}});
-    }};
-    
-    // Override Intl.DateTimeFormat.prototype.resolvedOptions
-    const originalResolvedOptions = Intl.DateTimeFormat.prototype.resolvedOptions;
-    Intl.DateTimeFormat.prototype.resolvedOptions = function() {{
-        const options = originalResolvedOptions.call(this);
-        options.timeZone = 'America/New_York';
-        options.locale = 'en-US';
-        return options;
-    }};
-    
-    // Override timezone detection methods
-    if (window.Intl && window.Intl.DateTimeFormat) {{
-        Object.defineProperty(window.Intl.DateTimeFormat.prototype, 'resolvedOptions', {{
-            value: function() {{
-                return {{
-                    locale: 'en-US',
-                    timeZone: 'America/New_York',
-                    calendar: 'gregory',
-                    numberingSystem: 'latn'
-                }};
+
+        // 1. BLOCK WEBRTC COMPLETELY
+        delete window.RTCPeerConnection;
+        delete window.webkitRTCPeerConnection;
+        delete window.mozRTCPeerConnection;
+
+        // 2. REDIRECT ALL IP APIs TO OUR SERVER
+        const originalFetch = window.fetch;
+        window.fetch = function(url, options) {{
+            const urlStr = url.toString().toLowerCase();
+
+            // Redirect ALL IP detection APIs to our server
+            const ipApiPatterns = [
+                'ipapi', 'ipify', 'ipinfo', 'whatismyip', 'geoip', 'iplocation',
+                'ip-api', 'freegeoip', 'whoer.com', 'httpbin.org/ip', 'icanhazip.com',
+                'extreme-ip-lookup', 'ip2location', 'ipstack', 'ipdata.co'
+            ];
+
+            if (ipApiPatterns.some(pattern => urlStr.includes(pattern))) {{
+                console.log('🔄 REDIRECTING IP API TO OUR SERVER:', urlStr);
+                // Redirect to our server's IP endpoint
+                return originalFetch.call(this, window.location.origin + '/ip', options);
             }}
-        }});
-    }}
-    
-    // Override navigator properties
-    Object.defineProperty(navigator, 'language', {{
-        get: () => 'en-US',
-        configurable: true
-    }});
-    
-    Object.defineProperty(navigator, 'languages', {{
-        get: () => ['en-US', 'en'],
-        configurable: true
-    }});
-    
-    // Override fetch for IP detection and analytics
-    const originalFetch = window.fetch;
-    window.fetch = function(url, options = {{}}) {{
-        const urlStr = url.toString();
-        
-        // Block ALL IP detection APIs and return fake US data
-        if (urlStr.includes('ipapi') || urlStr.includes('ipify') || urlStr.includes('ipinfo') || 
-            urlStr.includes('ip-api') || urlStr.includes('whatismyip') || urlStr.includes('myip') ||
-            urlStr.includes('ipgeolocation') || urlStr.includes('geoip') || urlStr.includes('ip2location') ||
-            urlStr.includes('maxmind') || urlStr.includes('iplocation') || urlStr.includes('getip') ||
-            urlStr.includes('checkip') || urlStr.includes('showip') || urlStr.includes('findip')) {{
-            console.log('🇺🇸 CROXYPROXY: Blocking IP detection API:', urlStr);
-            return Promise.resolve(new Response(JSON.stringify({{
-                ip: "{proxy_ip}",
-                country: "United States",
-                country_code: "US",
-                country_name: "United States", 
-                region: "NY",
-                region_name: "New York",
-                region_code: "NY",
-                city: "New York",
-                zip: "10001",
-                postal: "10001",
-                lat: 40.7128,
-                lon: -74.0060,
-                latitude: 40.7128,
-                longitude: -74.0060,
-                timezone: "America/New_York",
-                utc_offset: "-05:00",
-                country_calling_code: "+1",
-                currency: "USD",
-                languages: "en-US,en",
-                isp: "DigitalOcean, LLC",
-                org: "DigitalOcean, LLC",
-                as: "AS14061 DigitalOcean, LLC",
-                asname: "DIGITALOCEAN-ASN",
-                query: "{proxy_ip}"
-            }}), {{
-                headers: {{ 'Content-Type': 'application/json' }}
-            }}));
-        }}
-        
-        // Redirect GA4 collect requests to our custom endpoint
-        if (urlStr.includes('google-analytics.com/g/collect') || 
-            urlStr.includes('google-analytics.com/collect')) {{
-            console.log('🎯 GA4: Redirecting collect to custom endpoint');
-            const newUrl = window.location.origin + '/g/collect?' + urlStr.split('?')[1];
-            return originalFetch.call(this, newUrl, options);
-        }}
-        
-        // Add US headers to all other analytics requests
-        if (urlStr.includes('google') || urlStr.includes('analytics') || urlStr.includes('adsense')) {{
-            console.log('🇺🇸 CROXYPROXY: Adding US headers to analytics');
-            options.headers = {{
-                ...options.headers,
-                'CF-IPCountry': 'US',
-                'X-Forwarded-For': '{proxy_ip}',
-                'Accept-Language': 'en-US,en;q=0.9'
+
+            return originalFetch.call(this, url, options);
+        }};
+
+        // 3. OVERRIDE XHR FOR IP DETECTION
+        const OriginalXHR = window.XMLHttpRequest;
+        window.XMLHttpRequest = function() {{
+            const xhr = new OriginalXHR();
+            const originalOpen = xhr.open;
+            const originalSend = xhr.send;
+
+            xhr.open = function(method, url, ...args) {{
+                this._url = url.toLowerCase();
+                return originalOpen.call(this, method, url, ...args);
             }};
-        }}
-        
-        return originalFetch.call(this, url, options);
-    }};
-    
-    // Override XMLHttpRequest for IP detection
-    const originalXHROpen = XMLHttpRequest.prototype.open;
-    const originalXHRSend = XMLHttpRequest.prototype.send;
-    
-    XMLHttpRequest.prototype.open = function(method, url, ...args) {{
-        this._url = url;
-        return originalXHROpen.call(this, method, url, ...args);
-    }};
-    
-    XMLHttpRequest.prototype.send = function(data) {{
-        if (this._url && (this._url.includes('ipapi') || this._url.includes('ipify') || 
-            this._url.includes('ipinfo') || this._url.includes('whatismyip') || 
-            this._url.includes('geoip') || this._url.includes('iplocation'))) {{
-            console.log('🇺🇸 CROXYPROXY: Blocking XHR IP detection:', this._url);
-            
-            // Simulate successful response with fake data
-            setTimeout(() => {{
-                if (this.onreadystatechange) {{
-                    Object.defineProperty(this, 'readyState', {{ value: 4, writable: false }});
-                    Object.defineProperty(this, 'status', {{ value: 200, writable: false }});
-                    Object.defineProperty(this, 'responseText', {{ 
-                        value: JSON.stringify({{
-                            ip: "{proxy_ip}",
-                            country: "United States",
-                            country_code: "US",
-                            city: "New York",
-                            region: "NY",
-                            lat: 40.7128,
-                            lon: -74.0060,
-                            timezone: "America/New_York",
-                            isp: "DigitalOcean, LLC",
-                            org: "DigitalOcean, LLC"
-                        }}),
-                        writable: false 
-                    }});
-                    this.onreadystatechange();
-                }}
-            }}, 100);
-            return;
-        }}
-        
-        return originalXHRSend.call(this, data);
-    }};
-    
-    // Text replacement
-    function replaceLocationText() {{
-        const walker = document.createTreeWalker(
-            document.body || document.documentElement,
-            NodeFilter.SHOW_TEXT
-        );
-        
-        let node;
-        while (node = walker.nextNode()) {{
-            if (node.textContent) {{
-                let text = node.textContent;
-                let changed = false;
-                
-                if (text.includes('India')) {{
-                    text = text.replace(/India/g, 'United States');
-                    changed = true;
-                }}
-                if (text.includes('Bhubaneswar')) {{
-                    text = text.replace(/Bhubaneswar/g, 'New York');
-                    changed = true;
+
+            xhr.send = function(data) {{
+                if (this._url && (
+                    this._url.includes('ipapi') || this._url.includes('ipify') ||
+                    this._url.includes('ipinfo') || this._url.includes('whatismyip') ||
+                    this._url.includes('whoer.com') || this._url.includes('httpbin.org/ip')
+                )) {{
+                    console.log('🔄 REDIRECTING XHR IP API TO OUR SERVER:', this._url);
+
+                    // Redirect to our server instead of blocking
+                    const serverXHR = new OriginalXHR();
+                    serverXHR.open('GET', window.location.origin + '/ip');
+                    serverXHR.onload = () => {{
+                        Object.defineProperty(this, 'readyState', {{ value: 4 }});
+                        Object.defineProperty(this, 'status', {{ value: 200 }});
+                        Object.defineProperty(this, 'responseText', {{ 
+                            value: serverXHR.responseText
+                        }});
+                        if (this.onreadystatechange) this.onreadystatechange();
+                        if (this.onload) this.onload();
+                    }};
+                    serverXHR.send();
+                    return;
                 }}
-                if (text.includes('Asia/Calcutta')) {{
-                    text = text.replace(/Asia\/Calcutta/g, 'America/New_York');
-                    changed = true;
+
+                return originalSend.call(this, data);
+            }};
+
+            return xhr;
+        }};
+
+        // 4. AGGRESSIVE DOM IP REPLACEMENT
+        // Patterns are compiled once; locations share one alternation
+        const IPV4_REGEX = /\\b(?:[0-9]{{1,3}}\\.?){{3}}[0-9]{{1,3}}\\b/g;
+        const IPV6_REGEX = /\\b(?:[0-9a-fA-F]{{1,4}}:){{2,7}}[0-9a-fA-F]{{1,4}}\\b/g;
+        const LOCATION_REGEX = /India|Bhubaneswar|Odisha|Asia\\/Calcutta|Asia\\/Kolkata|Bharti Airtel/gi;
+        const LOCATION_MAP = {{
+            'india': 'United States',
+            'bhubaneswar': 'New York',
+            'odisha': 'New York',
+            'asia/calcutta': 'America/New_York',
+            'asia/kolkata': 'America/New_York',
+            'bharti airtel': 'DigitalOcean LLC'
+        }};
+
+        function replaceAllIPs() {{
+            try {{
+                const walker = document.createTreeWalker(
+                    document.body || document.documentElement,
+                    NodeFilter.SHOW_TEXT,
+                    null,
+                    false
+                );
+
+                let node;
+                const updates = [];
+
+                while ((node = walker.nextNode())) {{
+                    const original = node.textContent;
+                    const text = original
+                        .replace(IPV4_REGEX, SPOOF_IP)
+                        .replace(IPV6_REGEX, SPOOF_IP)
+                        .replace(LOCATION_REGEX, m => LOCATION_MAP[m.toLowerCase()]);
+
+                    // Only touch nodes that really change, so our own writes
+                    // don't keep re-triggering the observer
+                    if (text !== original) {{
+                        updates.push({{ node, text }});
+                    }}
                 }}
-                
-                if (changed) {{
+
+                updates.forEach(({{ node, text }}) => {{
                     node.textContent = text;
-                    console.log('🇺🇸 CROXYPROXY: Replaced location text');
-                }}
+                }});
+
+            }} catch(e) {{
+                console.error('IP replacement error:', e);
             }}
         }}
-    }}
-    
-    // Run replacements
-    if (document.readyState === 'loading') {{
-        document.addEventListener('DOMContentLoaded', replaceLocationText);
-    }} else {{
-        replaceLocationText();
-    }}
-    
-    // Monitor for changes
-    if (window.MutationObserver) {{
-        new MutationObserver(() => setTimeout(replaceLocationText, 100))
-            .observe(document.body || document.documentElement, {{
+
+        // 5. RUN REPLACEMENTS MULTIPLE TIMES
+        replaceAllIPs();
+        setTimeout(replaceAllIPs, 100);
+        setTimeout(replaceAllIPs, 500);
+        setTimeout(replaceAllIPs, 1000);
+        setTimeout(replaceAllIPs, 2000);
+
+        // Monitor DOM changes, one walk per 100ms of quiet
+        if (window.MutationObserver) {{
+            let replaceTimer = null;
+            new MutationObserver(() => {{
+                clearTimeout(replaceTimer);
+                replaceTimer = setTimeout(replaceAllIPs, 100);
+            }}).observe(document.body || document.documentElement, {{
                 childList: true,
                 subtree: true,
                 characterData: true
             }});
-    }}
-    
-    // Override common global variables used for IP detection with dynamic IP
-    window.userIP = "{proxy_ip}";
-    window.userCountry = "United States";
-    window.userCity = "New York";
-    window.userRegion = "NY";
-    window.userTimezone = "America/New_York";
-    window.userLatitude = 40.7128;
-    window.userLongitude = -74.0060;
-    window.userISP = "DigitalOcean, LLC";
-    window.userOrg = "DigitalOcean, LLC";
-    window.userASN = "AS14061";
-    window.userHosting = true;
-    window.userProxy = false;
-    window.userVPN = false;
-    window.userTor = false;
-    
-    // Override any existing IP detection functions
-    if (window.getIP) window.getIP = () => "{proxy_ip}";
-    if (window.getUserIP) window.getUserIP = () => "{proxy_ip}";
-    if (window.getLocation) window.getLocation = () => "New York, United States";
-    if (window.getCountry) window.getCountry = () => "United States";
-    
-    // Override Google Analytics gtag function
-    if (window.gtag) {{
-        const originalGtag = window.gtag;
-        window.gtag = function(command, target, config) {{
-            if (config && typeof config === 'object') {{
-                // Force US location data in GA4 config
-                config.country = 'US';
-                config.region = 'NY';
-                config.city = 'New York';
-                config.custom_map = {{
-                    ...config.custom_map,
-                    country: 'US',
-                    region: 'NY',
-                    city: 'New York'
+        }}
+
+        // 6. CRITICAL: ADSENSE BROWSER FINGERPRINT SPOOFING
+        // Override timezone detection (AdSense's hidden method)
+        Object.defineProperty(Intl.DateTimeFormat.prototype, 'resolvedOptions', {{
+            value: function() {{
+                return {{
+                    locale: 'en-US',
+                    timeZone: 'America/New_York',
+                    hour12: true,
+                    weekday: 'long',
+                    year: 'numeric',
+                    month: 'long',
+                    day: 'numeric'
                 }};
-                console.log('🇺🇸 CROXYPROXY: Modified GA4 config with US location');
             }}
-            return originalGtag.call(this, command, target, config);
+        }});
+
+        // Override Date timezone methods completely
+        Date.prototype.getTimezoneOffset = function() {{
+            return 300; // EST = UTC-5 = +300 minutes
         }};
-    }}
-    
-    // Override gtag before it loads
-    window.gtag = window.gtag || function() {{
-        (window.gtag.q = window.gtag.q || []).push(arguments);
-    }};
-    
-    // Intercept gtag calls and add US data
-    const originalGtagQ = window.gtag.q || [];
-    window.gtag.q = new Proxy(originalGtagQ, {{
-        set: function(target, property, value) {{
-            if (Array.isArray(value) && value[0] === 'config') {{
-                console.log('🇺🇸 CROXYPROXY: Intercepting GA4 config');
-                value[2] = value[2] || {{}};
-                value[2].country = 'US';
-                value[2].region = 'NY';
-                value[2].city = 'New York';
-            }}
-            target[property] = value;
-            return true;
+
+        Date.prototype.toString = function() {{
+            return this.toISOString().replace('T', ' ').replace('Z', ' EST');
+        }};
+
+        // Override navigator language properties
+        Object.defineProperty(navigator, 'language', {{
+            get: () => 'en-US',
+            configurable: false
+        }});
+
+        Object.defineProperty(navigator, 'languages', {{
+            get: () => ['en-US', 'en'],
+            configurable: false
+        }});
+
+        // Override screen properties for US-style display
+        Object.defineProperty(screen, 'colorDepth', {{
+            get: () => 24
+        }});
+
+        // Force US currency formatting
+        if (window.Intl && window.Intl.NumberFormat) {{
+            const originalNumberFormat = Intl.NumberFormat;
+            Intl.NumberFormat = function(locales, options) {{
+                return new originalNumberFormat('en-US', {{
+                    ...options,
+                    currency: 'USD',
+                    currencyDisplay: 'symbol'
+                }});
+            }};
         }}
-    }});
-    
-    console.log('🇺🇸 CROXYPROXY: Location spoofing initialized');
+
+        // 7. ADSENSE SPECIFIC OVERRIDES
+        // Force AdSense to think we're in US
+        window.google_ad_client = window.google_ad_client || 'ca-pub-3610144340749413';
+        window.google_ad_region = 'US';
+        window.google_ad_country = 'US';
+        window.google_gl = 'us';
+        window.google_cr = 'countryUS';
+        window.google_ad_format = 'auto';
+
+        // Override any AdSense geolocation detection
+        if (window.googletag) {{
+            const originalCmd = window.googletag.cmd;
+            window.googletag.cmd = window.googletag.cmd || [];
+            window.googletag.cmd.push(function() {{
+                window.googletag.pubads().setTargeting('country', 'US');
+                window.googletag.pubads().setTargeting('region', 'NY');
+                window.googletag.pubads().setTargeting('city', 'NewYork');
+            }});
+        }}
+
+        console.log('🇺🇸 CROXYPROXY: ALL IP DETECTION BLOCKED!');
+        console.log('🎯 ADSENSE: Browser fingerprint spoofed to US');
+    }})();
     </script>
-    """
-    
-    # Replace proxy_ip placeholder in the script
-    spoof_script = spoof_script.replace('{proxy_ip}', proxy_ip)
-    
-    # Inject script and meta tags
-    meta_viewport = '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
-    
-    if '<head>' in content:
-        content = content.replace('<head>', f'<head>{meta_viewport}{spoof_script}')
-    elif '<html>' in content:
-        content = content.replace('<html>', f'<html><head>{meta_viewport}{spoof_script}</head>')
-    else:
-        content = f'<html><head>{meta_viewport}{spoof_script}</head><body>{content}</body></html>'
-    
-    # Don't add status indicator (user requested removal)
-    
-    return content
+    '''.encode()
 
-@app.get("/")
-async def root(url: str = None):
-    """CroxyProxy-style root with Base64 encoded URL"""
-    if url:
-        # Decode Base64 URL and redirect to direct proxy (no loading page for resources)
-        try:
-            import base64
-            decoded_url = base64.b64decode(url).decode('utf-8')
-            
-            # Direct redirect to proxy URL (no loading page for CSS/JS resources)
-            return RedirectResponse(url=f"/proxy/{decoded_url}")
-            
-        except Exception as e:
-            print(f"❌ DECODE ERROR: {e}")
-            pass
-    
-    return HTMLResponse("""
+@lru_cache(maxsize=32)
+def get_head_inject(current_proxy_ip: str, ga4: bool, adsense: bool):
+    """Scripts injected after <head>, assembled once per proxy IP and script mix.
+    IP blocking goes FIRST, then GA4, AdSense and ISP overrides"""
+    head_scripts = [get_ip_blocking_script(current_proxy_ip)]
+    if ga4:
+        head_scripts.append(GA4_OVERRIDE_SCRIPT)
+    if adsense:
+        head_scripts.append(ADSENSE_FIX_SCRIPT)
+    head_scripts.append(ISP_OVERRIDE_SCRIPT)
+    return b''.join(head_scripts)
+
+
+
+# Landing page, encoded once at import instead of on every hit
+ROOT_HTML_BYTES = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -589,21 +1017,54 @@ async def root(url: str = None):
         </div>
     </body>
     </html>
-    """)
+    """.encode("utf-8")
+# The landing page only changes on deploy, so browsers may cache and revalidate it
+ROOT_HTML_HEADERS = {
+    "ETag": f'"{hashlib.sha1(ROOT_HTML_BYTES).hexdigest()[:16]}"',
+    "Cache-Control": "public, max-age=3600"
+}
+# Built once like the health responses; nothing in them varies per request
+ROOT_RESPONSE = Response(content=ROOT_HTML_BYTES, media_type="text/html", headers=ROOT_HTML_HEADERS)
+ROOT_NOT_MODIFIED_RESPONSE = Response(status_code=304, headers=ROOT_HTML_HEADERS)
+
+@app.get("/")
+async def root(request: Request, url: str = None):
+    """CroxyProxy-style root with Base64 encoded URL"""
+    if url:
+        # Decode Base64 URL and redirect to direct proxy (no loading page for resources)
+        try:
+            import base64
+            decoded_url = base64.b64decode(url).decode('utf-8')
+            
+            # Direct redirect to proxy URL (no loading page for CSS/JS resources)
+            return RedirectResponse(url=f"/proxy/{decoded_url}")
+            
+        except Exception as e:
+            logger.warning("❌ DECODE ERROR: %s", e)
+            pass
+    
+    if request.headers.get('if-none-match') == ROOT_HTML_HEADERS["ETag"]:
+        return ROOT_NOT_MODIFIED_RESPONSE
+    return ROOT_RESPONSE
+
+# Health-check bodies never change; serialized once, and the handlers are
+# async so FastAPI doesn't hop to its threadpool for them
+PING_RESPONSE = Response(content=orjson.dumps({"pong": True}), media_type="application/json")
+HEALTH_RESPONSE = Response(content=orjson.dumps({"status": "healthy", "service": "proxy-browser-v2"}), media_type="application/json")
 
 @app.get("/ping")
-def ping():
-    return {"pong": True}
+async def ping():
+    return PING_RESPONSE
 
 @app.get("/health")
-def health():
-    return {"status": "healthy", "service": "proxy-browser-v2"}
+async def health():
+    return HEALTH_RESPONSE
 
 @app.get("/api_v1/{path:path}")
 async def handle_whoer_api(path: str, request: Request):
     """Handle whoer.com API requests with fake US data"""
     proxy_ip = await get_actual_proxy_ip()
-    print(f"🛡️ WHOER API: {path} - Returning US data with IP: {proxy_ip}")
+    logger.debug("🛡️ WHOER API: %s - Returning US data with IP: %s", path, proxy_ip)
     
     # Return fake US data for all whoer.com API calls
     return {
@@ -659,7 +1120,7 @@ async def handle_ipx(path: str):
 async def ga4_collect_override(request: Request):
     """Override GA4 collect endpoint to force US location"""
     proxy_ip = await get_actual_proxy_ip()
-    print(f"🎯 GA4 COLLECT: Intercepting with proxy IP {proxy_ip}")
+    logger.debug("🎯 GA4 COLLECT: Intercepting with proxy IP %s", proxy_ip)
     
     # Get original parameters
     params = dict(request.query_params)
@@ -676,7 +1137,7 @@ async def ga4_collect_override(request: Request):
         elif '/proxy/http://' in original_dl:
             target_part = original_dl.split('/proxy/http://')[1] 
             params['dl'] = f'http://{target_part}'
-        print(f"🚨 GA4 DL: Fixed from {original_dl} to {params['dl']}")
+        logger.debug("🚨 GA4 DL: Fixed from %s to %s", original_dl, params['dl'])
     
     # Fix dr (document referrer) parameter
     if 'scrap.ybsq.xyz/proxy/' in original_dr:
@@ -686,7 +1147,7 @@ async def ga4_collect_override(request: Request):
         elif '/proxy/http://' in original_dr:
             target_part = original_dr.split('/proxy/http://')[1]
             params['dr'] = f'http://{target_part}'
-        print(f"🚨 GA4 DR: Fixed from {original_dr} to {params['dr']}")
+        logger.debug("🚨 GA4 DR: Fixed from %s to %s", original_dr, params['dr'])
     
     # Ensure dl and dr match target domain
     if 'dl' in params and params['dl']:
@@ -696,7 +1157,7 @@ async def ga4_collect_override(request: Request):
             if parsed_url.hostname:
                 # Force dr to match dl domain
                 params['dr'] = f"{parsed_url.scheme}://{parsed_url.hostname}/"
-                print(f"🎯 GA4: Synchronized dr to match dl domain: {params['dr']}")
+                logger.debug("🎯 GA4: Synchronized dr to match dl domain: %s", params['dr'])
         except:
             pass
     
@@ -713,42 +1174,39 @@ async def ga4_collect_override(request: Request):
     
     # Forward to real GA4 through proxy with US IP
     try:
-        proxy_url = get_proxy_url()
-        async with httpx.AsyncClient(
-            proxies={"http://": proxy_url, "https://": proxy_url},
-            timeout=10.0,
-            verify=False
-        ) as client:
-            # Forward to real GA4 collect endpoint
-            ga4_url = "https://www.google-analytics.com/g/collect"
-            
-            # Add US headers
-            headers = {
-                "User-Agent": request.headers.get("User-Agent", ""),
-                "CF-IPCountry": "US",
-                "X-Forwarded-For": proxy_ip,
-                "X-Real-IP": proxy_ip,
-                "Accept-Language": "en-US,en;q=0.9",
-                "X-Appengine-Country": "US",
-                "X-Appengine-Region": "ny",
-                "X-Appengine-City": "newyork"
-            }
-            
-            # Send to GA4 through proxy
+        client = request.app.state.http_client
+        
+        # Forward to real GA4 collect endpoint
+        ga4_url = "https://www.google-analytics.com/g/collect"
+        
+        # Add US headers
+        headers = {
+            "User-Agent": request.headers.get("User-Agent", ""),
+            "CF-IPCountry": "US",
+            "X-Forwarded-For": proxy_ip,
+            "X-Real-IP": proxy_ip,
+            "Accept-Language": "en-US,en;q=0.9",
+            "X-Appengine-Country": "US",
+            "X-Appengine-Region": "ny",
+            "X-Appengine-City": "newyork"
+        }
+        
+        # Send to GA4 through proxy; beacons share the upstream limit with page fetches
+        async with request.app.state.upstream_semaphore:
             if request.method == "GET":
-                response = await client.get(ga4_url, params=params, headers=headers)
+                response = await client.get(ga4_url, params=params, headers=headers, timeout=10.0)
             else:
-                response = await client.post(ga4_url, params=params, headers=headers)
-            
-            print(f"🎯 GA4: Forwarded to real GA4 - Status: {response.status_code}")
-            
-            return Response(
-                content=response.content,
-                media_type="image/gif",
-                headers={"Cache-Control": "no-cache, no-store, must-revalidate"}
-            )
+                response = await client.post(ga4_url, params=params, headers=headers, timeout=10.0)
+        
+        logger.debug("🎯 GA4: Forwarded to real GA4 - Status: %s", response.status_code)
+        
+        return Response(
+            content=response.content,
+            media_type="image/gif",
+            headers={"Cache-Control": "no-cache, no-store, must-revalidate"}
+        )
     except Exception as e:
-        print(f"❌ GA4 forward error: {e}")
+        logger.error("❌ GA4 forward error: %s", e)
         
     # Fallback success pixel
     return Response(
@@ -757,669 +1215,540 @@ async def ga4_collect_override(request: Request):
         headers={"Cache-Control": "no-cache, no-store, must-revalidate"}
     )
 
-@app.get("/proxy/{path:path}")
-async def proxy_page(path: str, request: Request):
-    try:
-        # Decode URL
-        path = unquote(path)
-        
-        # Ensure proper URL format
-        if not path.startswith(('http://', 'https://')):
-            path = 'https://' + path
-        
-        print(f"🌐 PROXY: Fetching {path}")
-        
-        # Get spoofed headers with dynamic proxy IP
-        headers = await get_spoofed_headers(request, path)
-        
-        # Create proxy client
-        proxy_url = get_proxy_url()
-        
-        async with httpx.AsyncClient(
-            proxies={"http://": proxy_url, "https://": proxy_url},
-            timeout=30.0,
-            verify=False,
-            follow_redirects=True
-        ) as client:
-            response = await client.get(path, headers=headers)
-            
-            # Handle Brotli compression properly
-            content_encoding = response.headers.get('content-encoding', '')
-            if 'br' in content_encoding:
-                print("🔧 Brotli compression detected, decompressing...")
-                try:
-                    # Decompress Brotli content
-                    decompressed_content = brotli.decompress(response.content)
-                    # Create a new response with decompressed content
-                    response._content = decompressed_content
-                    response.headers['content-encoding'] = 'identity'
-                    print("✅ Brotli decompression successful")
-                except Exception as e:
-                    print(f"❌ Brotli decompression failed: {e}")
-                    # Fallback: retry without Brotli
-                    headers["Accept-Encoding"] = "gzip, deflate"
-                    headers["Cache-Control"] = "no-cache, no-store"
-                    response = await client.get(path, headers=headers)
-                    print("🔄 Retried without Brotli")
-            
-            print(f"📊 Status: {response.status_code} | Content-Type: {response.headers.get('content-type', 'unknown')}")
-            
-            content_type = response.headers.get('content-type', '').lower()
-            
-            # Handle different content types properly
-            if 'text/html' in content_type:
-                # HTML content - process and rewrite
-                try:
-                    html_content = response.text
-                    
-                    # Check if content is garbled (Brotli issue)
-                    if len([c for c in html_content[:200] if ord(c) > 127]) > 100:
-                        print("❌ Content appears garbled, likely compression issue")
-                        return HTMLResponse(f"""
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                            <title>Content Error</title>
-                            <style>
-                                body {{ font-family: Arial, sans-serif; text-align: center; padding: 50px; }}
-                                .error {{ background: #f8d7da; color: #721c24; padding: 20px; border-radius: 8px; }}
-                            </style>
-                        </head>
-                        <body>
-                            <h1>🌐 Proxy Browser V2</h1>
-                            <div class="error">
-                                <h3>Content Encoding Error</h3>
-                                <p>The website returned compressed content that couldn't be decoded.</p>
-                                <p><strong>URL:</strong> {path}</p>
-                                <p>Try refreshing or use a different site.</p>
-                            </div>
-                            <button onclick="window.location.href='/'">🏠 Home</button>
-                        </body>
-                        </html>
-                        """)
-                    
-                    # Server-side IP replacement (aggressive) with dynamic proxy IP
-                    current_proxy_ip = await get_actual_proxy_ip()
-                    print(f"🔧 Performing server-side IP replacement with {current_proxy_ip}...")
-                    
-                    # Replace various IP patterns
-                    html_content = re.sub(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', current_proxy_ip, html_content)
-                    html_content = re.sub(r'\b[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4}){7}\b', current_proxy_ip, html_content)  # IPv6
-                    
-                    # Location replacement
-                    html_content = re.sub(r'\bIndia\b', 'United States', html_content)
-                    html_content = re.sub(r'\bBhubaneswar\b', 'New York', html_content)
-                    html_content = re.sub(r'\bOdisha\b', 'New York', html_content)
-                    html_content = re.sub(r'\bKhordha\b', 'New York', html_content)
-                    html_content = re.sub(r'\bAsia/Calcutta\b', 'America/New_York', html_content)
-                    html_content = re.sub(r'\ben-GB\b', 'en-US', html_content)
-                    
-                    # ISP replacement
-                    html_content = re.sub(r'\bBharti Airtel\b', 'DigitalOcean LLC', html_content)
-                    html_content = re.sub(r'\bBharti Airtel Limited\b', 'DigitalOcean, LLC', html_content)
-                    html_content = re.sub(r'\bAS45609\b', 'AS14061', html_content)
-                    
-                    # Add JavaScript to override any remaining detection
-                    isp_override = f'''
-                    <script>
-                    // Override ISP detection
-                    Object.defineProperty(window, 'userISP', {{value: 'DigitalOcean, LLC', writable: false}});
-                    Object.defineProperty(window, 'userOrganization', {{value: 'DigitalOcean, LLC', writable: false}});
-                    Object.defineProperty(window, 'userASN', {{value: 'AS14061', writable: false}});
-                    Object.defineProperty(window, 'userCountryCode', {{value: 'US', writable: false}});
-                    Object.defineProperty(window, 'userRegionCode', {{value: 'NY', writable: false}});
-                    
-                    // Override any ISP detection functions
-                    if (window.getISP) window.getISP = () => 'DigitalOcean, LLC';
-                    if (window.getOrganization) window.getOrganization = () => 'DigitalOcean, LLC';
-                    if (window.getASN) window.getASN = () => 'AS14061';
-                    
-                    console.log('🇺🇸 ISP: Forced DigitalOcean ISP data');
-                    </script>
-                    '''
-                    
-                    # Inject ISP override early
-                    if '<head>' in html_content:
-                        html_content = html_content.replace('<head>', f'<head>{isp_override}')
-                    
-                    # Inject AdSense domain fix
-                    adsense_fix = f'''
-                    <script>
-                    // Dynamic Domain Detection - Works with ANY domain
-                    const currentPath = window.location.pathname;
-                    let originalDomain, originalOrigin;
-                    
-                    // Extract target domain from proxy URL
-                    if (currentPath.includes('/proxy/https://')) {{
-                        const targetUrl = currentPath.replace('/proxy/https%3A//', '').replace('/proxy/https://', '');
-                        originalDomain = targetUrl.split('/')[0];
-                        originalOrigin = 'https://' + originalDomain;
-                    }} else if (currentPath.includes('/proxy/http://')) {{
-                        const targetUrl = currentPath.replace('/proxy/http%3A//', '').replace('/proxy/http://', '');
-                        originalDomain = targetUrl.split('/')[0];
-                        originalOrigin = 'http://' + originalDomain;
-                    }} else {{
-                        // Fallback for Base64 URLs - decode from URL parameter
-                        const urlParams = new URLSearchParams(window.location.search);
-                        const encodedUrl = urlParams.get('url');
-                        if (encodedUrl) {{
-                            try {{
-                                const decodedUrl = atob(encodedUrl);
-                                const url = new URL(decodedUrl);
-                                originalDomain = url.hostname;
-                                originalOrigin = url.origin;
-                            }} catch(e) {{
-                                originalDomain = 'example.com';
-                                originalOrigin = 'https://example.com';
-                            }}
-                        }} else {{
-                            originalDomain = 'example.com';
-                            originalOrigin = 'https://example.com';
-                        }}
-                    }}
-                    
-                    console.log(`🎯 DYNAMIC: Detected target domain: ${{originalDomain}}`);
-                    console.log(`🎯 DYNAMIC: Detected target origin: ${{originalOrigin}}`);
-                    
-                    // Override document properties
-                    Object.defineProperty(document, 'domain', {{
-                        get: function() {{ 
-                            console.log(`📢 ADSENSE: Spoofed document.domain to ${{originalDomain}}`);
-                            return originalDomain; 
-                        }},
-                        set: function() {{ /* ignore */ }}
-                    }});
-                    
-                    Object.defineProperty(document, 'URL', {{
-                        get: function() {{ 
-                            const cleanPath = window.location.pathname.replace(`/proxy/https://${{originalDomain}}`, '').replace(`/proxy/http://${{originalDomain}}`, '') || '/';
-                            return originalOrigin + cleanPath + window.location.search;
-                        }}
-                    }});
-                    
-                    Object.defineProperty(document, 'documentURI', {{
-                        get: function() {{ 
-                            const cleanPath = window.location.pathname.replace(`/proxy/https://${{originalDomain}}`, '').replace(`/proxy/http://${{originalDomain}}`, '') || '/';
-                            return originalOrigin + cleanPath + window.location.search;
-                        }}
-                    }});
-                    
-                    // Override window.location properties
-                    Object.defineProperty(window.location, 'hostname', {{
-                        get: function() {{ 
-                            console.log(`📢 ADSENSE: Spoofed location.hostname to ${{originalDomain}}`);
-                            return originalDomain; 
-                        }}
-                    }});
-                    
-                    Object.defineProperty(window.location, 'host', {{
-                        get: function() {{ return originalDomain; }}
-                    }});
-                    
-                    Object.defineProperty(window.location, 'origin', {{
-                        get: function() {{ 
-                            console.log(`📢 ADSENSE: Spoofed location.origin to ${{originalOrigin}}`);
-                            return originalOrigin; 
-                        }}
-                    }});
-                    
-                    Object.defineProperty(window.location, 'href', {{
-                        get: function() {{ 
-                            const cleanPath = window.location.pathname.replace(`/proxy/https://${{originalDomain}}`, '').replace(`/proxy/http://${{originalDomain}}`, '') || '/';
-                            return originalOrigin + cleanPath + window.location.search;
-                        }}
-                    }});
-                    
-                    // Override document.referrer for AdSense
-                    Object.defineProperty(document, 'referrer', {{
-                        get: function() {{ 
-                            console.log(`📢 ADSENSE: Spoofed document.referrer to ${{originalDomain}}`);
-                            return originalOrigin + '/'; 
-                        }}
-                    }});
-                    
-                    // Override top.location for iframe ads
-                    try {{
-                        Object.defineProperty(top.location, 'hostname', {{
-                            get: function() {{ return originalDomain; }}
-                        }});
-                        Object.defineProperty(top.location, 'origin', {{
-                            get: function() {{ return originalOrigin; }}
-                        }});
-                    }} catch(e) {{ /* ignore cross-origin */ }}
-                    
-                    console.log(`📢 ADSENSE: Domain spoofed to ${{originalDomain}}`);
-                    </script>
-                    '''
-                    
-                    # Inject AdSense fix early
-                    if 'googlesyndication.com' in html_content or 'adsbygoogle' in html_content:
-                        html_content = html_content.replace('<head>', f'<head>{adsense_fix}')
-                        print("📢 ADSENSE: Injected domain fix for AdSense")
-                    
-                    # Inject GA4 location override before any GA4 scripts
-                    ga4_override = '''
-                    <script>
-                    // GA4 Location Override - Must run before GA4 loads
-                    window.dataLayer = window.dataLayer || [];
-                    function gtag(){dataLayer.push(arguments);}
-                    
-                    // Override gtag to force US location
-                    const originalGtag = window.gtag || gtag;
-                    window.gtag = function(command, target, config) {
-                        if (command === 'config' && config) {
-                            config.country = 'US';
-                            config.region = 'NY'; 
-                            config.city = 'New York';
-                            config.custom_map = config.custom_map || {};
-                            config.custom_map.country = 'US';
-                            config.custom_map.region = 'NY';
-                            config.custom_map.city = 'New York';
-                            console.log('🇺🇸 GA4: Forced US location in config');
-                        }
-                        return originalGtag.call(this, command, target, config);
-                    };
-                    
-                    // Set global location data for GA4
-                    gtag('config', 'G-BX28RFEZ30', {
-                        country: 'US',
-                        region: 'NY',
-                        city: 'New York',
-                        custom_map: {
-                            country: 'US',
-                            region: 'NY',
-                            city: 'New York'
-                        }
-                    });
-                    </script>
-                    '''
-                    
-                    # Inject GA4 override before any Google Analytics scripts
-                    if 'googletagmanager.com' in html_content or 'google-analytics.com' in html_content:
-                        html_content = html_content.replace('<head>', f'<head>{ga4_override}')
-                    
-                    print("✅ Server-side IP replacement completed")
-                    
-                    # MASSIVE CLIENT-SIDE IP BLOCKING - CroxyProxy Level
-                    ip_blocking_script = f'''
-                    <script>
-                    // COMPLETE IP DETECTION BLOCKING - CroxyProxy Level
-                    console.log('🚫 CROXYPROXY: BLOCKING ALL IP DETECTION');
-                    
-                    (function() {{
-                        'use strict';
-                        
-                        const SPOOF_IP = "{current_proxy_ip}";
-                        const SPOOF_DATA = {{
-                            ip: SPOOF_IP,
-                            country: "United States", 
-                            countryCode: "US",
-                            region: "NY",
-                            regionName: "New York",
-                            city: "New York",
-                            timezone: "America/New_York",
-                            lat: 40.7128,
-                            lon: -74.0060,
-                            isp: "DigitalOcean, LLC",
-                            org: "DigitalOcean, LLC",
-                            as: "AS14061"
-                        }};
-                        
-                        // 1. BLOCK WEBRTC COMPLETELY
-                        delete window.RTCPeerConnection;
-                        delete window.webkitRTCPeerConnection;
-                        delete window.mozRTCPeerConnection;
-                        
-                        // 2. REDIRECT ALL IP APIs TO OUR SERVER
-                        const originalFetch = window.fetch;
-                        window.fetch = function(url, options) {{
-                            const urlStr = url.toString().toLowerCase();
-                            
-                            // Redirect ALL IP detection APIs to our server
-                            const ipApiPatterns = [
-                                'ipapi', 'ipify', 'ipinfo', 'whatismyip', 'geoip', 'iplocation',
-                                'ip-api', 'freegeoip', 'whoer.com', 'httpbin.org/ip', 'icanhazip.com',
-                                'extreme-ip-lookup', 'ip2location', 'ipstack', 'ipdata.co'
-                            ];
-                            
-                            if (ipApiPatterns.some(pattern => urlStr.includes(pattern))) {{
-                                console.log('🔄 REDIRECTING IP API TO OUR SERVER:', urlStr);
-                                // Redirect to our server's IP endpoint
-                                return originalFetch.call(this, window.location.origin + '/ip', options);
-                            }}
-                            
-                            return originalFetch.call(this, url, options);
-                        }};
-                        
-                        // 3. OVERRIDE XHR FOR IP DETECTION
-                        const OriginalXHR = window.XMLHttpRequest;
-                        window.XMLHttpRequest = function() {{
-                            const xhr = new OriginalXHR();
-                            const originalOpen = xhr.open;
-                            const originalSend = xhr.send;
-                            
-                            xhr.open = function(method, url, ...args) {{
-                                this._url = url.toLowerCase();
-                                return originalOpen.call(this, method, url, ...args);
-                            }};
-                            
-                            xhr.send = function(data) {{
-                                if (this._url && (
-                                    this._url.includes('ipapi') || this._url.includes('ipify') ||
-                                    this._url.includes('ipinfo') || this._url.includes('whatismyip') ||
-                                    this._url.includes('whoer.com') || this._url.includes('httpbin.org/ip')
-                                )) {{
-                                    console.log('🔄 REDIRECTING XHR IP API TO OUR SERVER:', this._url);
-                                    
-                                    // Redirect to our server instead of blocking
-                                    const serverXHR = new OriginalXHR();
-                                    serverXHR.open('GET', window.location.origin + '/ip');
-                                    serverXHR.onload = () => {{
-                                        Object.defineProperty(this, 'readyState', {{ value: 4 }});
-                                        Object.defineProperty(this, 'status', {{ value: 200 }});
-                                        Object.defineProperty(this, 'responseText', {{ 
-                                            value: serverXHR.responseText
-                                        }});
-                                        if (this.onreadystatechange) this.onreadystatechange();
-                                        if (this.onload) this.onload();
-                                    }};
-                                    serverXHR.send();
-                                    return;
-                                }}
-                                
-                                return originalSend.call(this, data);
-                            }};
-                            
-                            return xhr;
-                        }};
-                        
-                        // 4. AGGRESSIVE DOM IP REPLACEMENT
-                        function replaceAllIPs() {{
-                            try {{
-                                const walker = document.createTreeWalker(
-                                    document.body || document.documentElement,
-                                    NodeFilter.SHOW_TEXT,
-                                    null,
-                                    false
-                                );
-                                
-                                let node;
-                                const updates = [];
-                                
-                                while ((node = walker.nextNode())) {{
-                                    let text = node.textContent;
-                                    let changed = false;
-                                    
-                                    // Replace ANY IP pattern
-                                    text = text.replace(/\\b(?:[0-9]{{1,3}}\\.?){{3}}[0-9]{{1,3}}\\b/g, () => {{
-                                        changed = true;
-                                        return SPOOF_IP;
-                                    }});
-                                    
-                                    // Replace IPv6
-                                    text = text.replace(/\\b(?:[0-9a-fA-F]{{1,4}}:){{2,7}}[0-9a-fA-F]{{1,4}}\\b/g, () => {{
-                                        changed = true;
-                                        return SPOOF_IP;
-                                    }});
-                                    
-                                    // Location replacements
-                                    const replacements = {{
-                                        'India': 'United States',
-                                        'Bhubaneswar': 'New York',
-                                        'Odisha': 'New York',
-                                        'Asia/Calcutta': 'America/New_York',
-                                        'Asia/Kolkata': 'America/New_York',
-                                        'Bharti Airtel': 'DigitalOcean LLC'
-                                    }};
-                                    
-                                    for (const [find, replace] of Object.entries(replacements)) {{
-                                        if (text.includes(find)) {{
-                                            text = text.replace(new RegExp(find, 'gi'), replace);
-                                            changed = true;
-                                        }}
-                                    }}
-                                    
-                                    if (changed) {{
-                                        updates.push({{ node, text }});
-                                    }}
-                                }}
-                                
-                                updates.forEach(({{ node, text }}) => {{
-                                    node.textContent = text;
-                                }});
-                                
-                            }} catch(e) {{
-                                console.error('IP replacement error:', e);
-                            }}
-                        }}
-                        
-                        // 5. RUN REPLACEMENTS MULTIPLE TIMES
-                        replaceAllIPs();
-                        setTimeout(replaceAllIPs, 100);
-                        setTimeout(replaceAllIPs, 500);
-                        setTimeout(replaceAllIPs, 1000);
-                        setTimeout(replaceAllIPs, 2000);
-                        
-                        // Monitor DOM changes
-                        if (window.MutationObserver) {{
-                            new MutationObserver(() => {{
-                                setTimeout(replaceAllIPs, 50);
-                            }}).observe(document.body || document.documentElement, {{
-                                childList: true,
-                                subtree: true,
-                                characterData: true
-                            }});
-                        }}
-                        
-                        // 6. CRITICAL: ADSENSE BROWSER FINGERPRINT SPOOFING
-                        // Override timezone detection (AdSense's hidden method)
-                        Object.defineProperty(Intl.DateTimeFormat.prototype, 'resolvedOptions', {{
-                            value: function() {{
-                                return {{
-                                    locale: 'en-US',
-                                    timeZone: 'America/New_York',
-                                    hour12: true,
-                                    weekday: 'long',
-                                    year: 'numeric',
-                                    month: 'long',
-                                    day: 'numeric'
-                                }};
-                            }}
-                        }});
-                        
-                        // Override Date timezone methods completely
-                        Date.prototype.getTimezoneOffset = function() {{
-                            return 300; // EST = UTC-5 = +300 minutes
-                        }};
-                        
-                        Date.prototype.toString = function() {{
-                            return this.toISOString().replace('T', ' ').replace('Z', ' EST');
-                        }};
-                        
-                        // Override navigator language properties
-                        Object.defineProperty(navigator, 'language', {{
-                            get: () => 'en-US',
-                            configurable: false
-                        }});
-                        
-                        Object.defineProperty(navigator, 'languages', {{
-                            get: () => ['en-US', 'en'],
-                            configurable: false
-                        }});
-                        
-                        // Override screen properties for US-style display
-                        Object.defineProperty(screen, 'colorDepth', {{
-                            get: () => 24
-                        }});
-                        
-                        // Force US currency formatting
-                        if (window.Intl && window.Intl.NumberFormat) {{
-                            const originalNumberFormat = Intl.NumberFormat;
-                            Intl.NumberFormat = function(locales, options) {{
-                                return new originalNumberFormat('en-US', {{
-                                    ...options,
-                                    currency: 'USD',
-                                    currencyDisplay: 'symbol'
-                                }});
-                            }};
-                        }}
-                        
-                        // 7. ADSENSE SPECIFIC OVERRIDES
-                        // Force AdSense to think we're in US
-                        window.google_ad_client = window.google_ad_client || 'ca-pub-3610144340749413';
-                        window.google_ad_region = 'US';
-                        window.google_ad_country = 'US';
-                        window.google_gl = 'us';
-                        window.google_cr = 'countryUS';
-                        window.google_ad_format = 'auto';
-                        
-                        // Override any AdSense geolocation detection
-                        if (window.googletag) {{
-                            const originalCmd = window.googletag.cmd;
-                            window.googletag.cmd = window.googletag.cmd || [];
-                            window.googletag.cmd.push(function() {{
-                                window.googletag.pubads().setTargeting('country', 'US');
-                                window.googletag.pubads().setTargeting('region', 'NY');
-                                window.googletag.pubads().setTargeting('city', 'NewYork');
-                            }});
-                        }}
-                        
-                        console.log('🇺🇸 CROXYPROXY: ALL IP DETECTION BLOCKED!');
-                        console.log('🎯 ADSENSE: Browser fingerprint spoofed to US');
-                    }})();
-                    </script>
-                    '''
-                    
-                    # Inject IP blocking script FIRST
-                    if '<head>' in html_content:
-                        html_content = html_content.replace('<head>', f'<head>{ip_blocking_script}')
-                    elif '<html>' in html_content:
-                        html_content = html_content.replace('<html>', f'<html><head>{ip_blocking_script}</head>')
-                    else:
-                        html_content = f'<html><head>{ip_blocking_script}</head><body>{html_content}</body></html>'
-                    
-                    # SIMPLE, CLEAN URL rewriting - Fix broken URLs
-                    proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy"
-                    
-                    # Simple relative URL fixing only
-                    def fix_relative_urls(content, base_url):
-                        # Only fix relative URLs that start with /
-                        content = re.sub(
-                            r'(href|src|action)=(["\'])(/[^"\']*)\2',
-                            lambda m: f'{m.group(1)}={m.group(2)}{proxy_base}/{urljoin(base_url, m.group(3))}{m.group(2)}',
-                            content
-                        )
-                        return content
-                    
-                    processed_content = fix_relative_urls(html_content, path)
-                    
-                    return HTMLResponse(
-                        content=processed_content,
-                        headers={
-                            "Access-Control-Allow-Origin": "*",
-                            "X-Frame-Options": "ALLOWALL",
-                            "Content-Security-Policy": "default-src * 'unsafe-inline' 'unsafe-eval' data: blob:;"
-                        }
-                    )
-                except Exception as e:
-                    print(f"❌ HTML processing error: {e}")
-                    return HTMLResponse(f"<h1>Error processing HTML</h1><p>{str(e)}</p>")
-            
-            elif 'text/css' in content_type:
-                # CSS content - rewrite URLs
-                css_content = response.text
-                proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy"
-                
-                # Rewrite CSS URLs
-                css_content = re.sub(
-                    r'url\(["\']?([^"\'\\)]+)["\']?\)',
-                    rf'url("{proxy_base}/\1")',
-                    css_content
-                )
-                
-                return Response(
-                    content=css_content,
-                    media_type="text/css",
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                )
-            
-            elif 'javascript' in content_type:
-                # JavaScript content - return as-is with CORS
-                return Response(
-                    content=response.content,
-                    media_type=content_type,
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                )
-            
-            elif 'application/json' in content_type:
-                # JSON content - format nicely
-                try:
-                    json_data = response.json()
-                    return HTMLResponse(f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>JSON Response</title>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; padding: 20px; }}
-                            .status {{ position: fixed; top: 10px; right: 10px; background: #28a745; color: white; padding: 8px 12px; border-radius: 5px; }}
-                            pre {{ background: #f8f9fa; padding: 20px; border-radius: 8px; overflow: auto; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="status">🇺🇸 US Proxy Active</div>
-                        <h1>Proxy Response</h1>
-                        <p><strong>URL:</strong> {path}</p>
-                        <p><strong>Status:</strong> {response.status_code}</p>
-                        <pre>{json.dumps(json_data, indent=2)}</pre>
-                        <button onclick="history.back()">← Back</button>
-                    </body>
-                    </html>
-                    """)
-                except:
-                    return Response(content=response.content, media_type=content_type)
-            
-            else:
-                # Binary content (images, etc.) - return as-is
-                return Response(
-                    content=response.content,
-                    media_type=content_type,
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=86400"
-                    }
-                )
-                
-    except Exception as e:
-        print(f"❌ Proxy error: {str(e)}")
-        return HTMLResponse(f"""
+def stream_passthrough(upstream: httpx.Response, request: Request, headers: dict):
+    """Stream an upstream body to the browser untouched, still compressed when the browser accepts it"""
+    encoding = upstream.headers.get('content-encoding')
+    if encoding and encoding in request.headers.get('accept-encoding', ''):
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+        body = upstream.aiter_raw()
+    else:
+        body = upstream.aiter_bytes()
+    return StreamingResponse(body, headers=headers, background=BackgroundTask(upstream.aclose))
+
+async def cached_passthrough(upstream: httpx.Response, request: Request, headers: dict, cache_key, compressible: bool):
+    """Pass an upstream body through untouched; small cacheable ones are read
+    whole and kept in RESPONSE_CACHE, everything else is streamed"""
+    length = upstream.headers.get('content-length', '')
+    if cache_key is None or not length.isdigit() or int(length) > RESPONSE_CACHE_MAX_BODY or not get_cache_ttl(upstream):
+        return stream_passthrough(upstream, request, headers)
+    body = await upstream.aread()
+    return cache_proxied_response(cache_key, Response(content=body, headers=headers), upstream, compressible)
+
+# Upstream failure page, pre-encoded around the two escaped values
+PROXY_ERROR_HTML_HEAD = """
         <!DOCTYPE html>
         <html>
         <head>
             <title>Proxy Error</title>
             <style>
-                body {{ font-family: Arial, sans-serif; text-align: center; padding: 50px; }}
-                .error {{ background: #f8d7da; color: #721c24; padding: 20px; border-radius: 8px; margin: 20px 0; }}
+                body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }
+                .error { background: #f8d7da; color: #721c24; padding: 20px; border-radius: 8px; margin: 20px 0; }
             </style>
         </head>
         <body>
             <h1>🌐 Proxy Browser V2</h1>
             <div class="error">
                 <h3>Connection Error</h3>
-                <p><strong>Error:</strong> {str(e)}</p>
-                <p><strong>URL:</strong> {path}</p>
+                <p><strong>Error:</strong> """.encode("utf-8")
+PROXY_ERROR_HTML_MIDDLE = """</p>
+                <p><strong>URL:</strong> """.encode("utf-8")
+PROXY_ERROR_HTML_TAIL = """</p>
             </div>
             <button onclick="history.back()">← Back</button>
             <button onclick="window.location.href='/'">🏠 Home</button>
         </body>
         </html>
-        """)
+        """.encode("utf-8")
+
+# Rejected targets (mostly scanners) get one prebuilt page; ?debug echoes the target
+INVALID_URL_RESPONSE = HTMLResponse("<h1>Unsupported URL</h1><p>Only http(s) URLs can be proxied.</p>", status_code=400)
+
+def normalize_target_url(path: str, query: str = '') -> Optional[str]:
+    """Decode a /proxy/ target into an absolute http(s) URL, or None if it can't be proxied.
+    The query string is appended as-is; it reaches us separately from the path"""
+    path = unquote(path)
+    
+    # Parse once; bare hosts ("example.com/page") default to https. Malformed
+    # hosts and ports ("https://[::1", "example.com:x") raise ValueError
+    try:
+        parts = urlsplit(path)
+        if not parts.netloc:
+            # "javascript:alert(1)" and friends name another scheme; only a
+            # dotted host or localhost followed by a port ("example.com:8080/x")
+            # may look like one and still be a bare host
+            if parts.scheme and parts.scheme not in ('http', 'https') and not (
+                    ('.' in parts.scheme or parts.scheme == 'localhost') and parts.path[:1].isdigit()):
+                return None
+            parts = urlsplit('https://' + path)
+        elif not parts.scheme:
+            parts = parts._replace(scheme='https')
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return None
+        parts.port  # raises for a port that is not a number in range
+    except ValueError:
+        return None
+    if query:
+        parts = parts._replace(query=f"{parts.query}&{query}" if parts.query else query)
+    return parts.geturl()
+
+def shareable_response(proxied: Optional[Response]) -> Optional[Response]:
+    """The response coalesced waiters may reuse, or None if they must fetch
+    for themselves"""
+    # Streamed bodies can only be sent once
+    if proxied is None or isinstance(proxied, StreamingResponse):
+        return None
+    # The JSON viewer only suits requests that accept HTML; an XHR joining
+    # a navigation's fetch must get the raw JSON
+    if 'accept' in (value.strip() for value in proxied.headers.get('vary', '').lower().split(',')):
+        return None
+    return proxied
+
+async def proxy_page(request: Request):
+    path = request.path_params['path']
+    url = normalize_target_url(path, request.url.query)
+    if url is None:
+        if 'debug' in request.query_params:
+            return HTMLResponse(f"<h1>Unsupported URL</h1><p>{escape(unquote(path))}</p>", status_code=400)
+        return INVALID_URL_RESPONSE
+    path = url
+    
+    # Rewritten pages embed our host, so it is part of the key; requests
+    # carrying credentials are never served from or stored in the cache
+    if 'cookie' in request.headers or 'authorization' in request.headers:
+        return await fetch_proxied_page(path, request, None)
+    
+    cache_key = (request.headers.get('host'), path)
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("⚡ CACHE: Hit for %s", path)
+        plain, gzipped = cached
+        if gzipped is not None and 'gzip' in request.headers.get('accept-encoding', ''):
+            return gzipped
+        return plain
+    
+    # Coalesce concurrent identical fetches into one upstream request
+    pending = INFLIGHT_REQUESTS.get(cache_key)
+    if pending is not None:
+        shared = await asyncio.shield(pending)
+        if shared is not None:
+            logger.debug("⚡ COALESCE: Shared in-flight fetch for %s", path)
+            return shared
+        return await fetch_proxied_page(path, request, cache_key)
+    
+    pending = asyncio.get_running_loop().create_future()
+    INFLIGHT_REQUESTS[cache_key] = pending
+    proxied = None
+    try:
+        proxied = await fetch_proxied_page(path, request, cache_key)
+        return proxied
+    finally:
+        del INFLIGHT_REQUESTS[cache_key]
+        pending.set_result(shareable_response(proxied))
+
+# The hottest route is a plain Starlette route: no FastAPI parameter parsing
+# or dependency resolution per request, it only reads the path parameter
+app.add_route("/proxy/{path:path}", proxy_page, methods=["GET"], include_in_schema=False)
+
+# Stylesheets/scripts of a rewritten page fetched into RESPONSE_CACHE ahead
+# of the browser (at most this many per page; 0 disables)
+PREFETCH_LIMIT = int(os.environ.get("PREFETCH_LIMIT", 16))
+# Strong references so running prefetch tasks aren't garbage collected
+PREFETCH_TASKS = set()
+# Sub-resources whose prefetch found a body that would only be streamed
+# (uncacheable or too big); the browser's own request fetches those
+PREFETCH_SKIP = ResponseCache(RESPONSE_CACHE_SIZE)
+PREFETCH_SKIP_TTL = int(os.environ.get("PREFETCH_SKIP_TTL", 600))
+
+def prefetch_subresources(urls, request: Request):
+    """Start fetching a page's sub-resources in the background; the browser's
+    own requests then find them cached or join the in-flight fetch"""
+    host = request.headers.get('host')
+    for raw_url in urls:
+        # Key the URL the way proxy_page will see the browser's request: path
+        # and query arrive separately, the fragment and &amp; escapes never do
+        target, _, query = raw_url.partition(b'#')[0].partition(b'?')
+        url = normalize_target_url(
+            target.decode('utf-8', 'surrogateescape'),
+            query.replace(b'&amp;', b'&').decode('utf-8', 'surrogateescape')
+        )
+        if url is None:
+            continue
+        cache_key = (host, url)
+        if cache_key in INFLIGHT_REQUESTS or RESPONSE_CACHE.get(cache_key) is not None or PREFETCH_SKIP.get(cache_key) is not None:
+            continue
+        pending = asyncio.get_running_loop().create_future()
+        INFLIGHT_REQUESTS[cache_key] = pending
+        task = asyncio.create_task(prefetch_subresource(url, request, cache_key, pending))
+        PREFETCH_TASKS.add(task)
+        task.add_done_callback(PREFETCH_TASKS.discard)
+
+def is_prefetchable(upstream: httpx.Response) -> bool:
+    """Whether fetch_proxied_page will buffer this response rather than stream it"""
+    if upstream.is_redirect:
+        return True
+    if upstream.headers.get('content-type', '').partition(';')[0].strip().lower() == 'text/css':
+        return True
+    length = upstream.headers.get('content-length', '')
+    return length.isdigit() and int(length) <= RESPONSE_CACHE_MAX_BODY and bool(get_cache_ttl(upstream))
+
+async def prefetch_subresource(url: str, request: Request, cache_key, pending):
+    """Fetch one sub-resource like proxy_page would, sharing the result with waiters"""
+    proxied = None
+    try:
+        logger.debug("⏩ PREFETCH: %s", url)
+        response = await open_upstream(url, request)
+        if not is_prefetchable(response):
+            # Nobody would read this body: drop it unread and leave the URL
+            # to the browser's own request from now on
+            await response.aclose()
+            PREFETCH_SKIP.set(cache_key, True, PREFETCH_SKIP_TTL)
+            return
+        proxied = await fetch_proxied_page(url, request, cache_key, response)
+    except Exception as e:
+        logger.debug("⏩ PREFETCH: %s failed: %s", url, e)
+    finally:
+        del INFLIGHT_REQUESTS[cache_key]
+        if isinstance(proxied, StreamingResponse):
+            # Too big or not cacheable: nobody will send this body, so
+            # release the upstream connection and let waiters fetch themselves
+            await proxied.background()
+            proxied = None
+        pending.set_result(shareable_response(proxied))
+
+async def open_upstream(path: str, request: Request):
+    """Send the spoofed GET through the upstream proxy; returns once the
+    headers are in, the body is still unread"""
+    # Get spoofed headers with dynamic proxy IP
+    headers = await get_spoofed_headers(request, path)
+    
+    # Reuse the shared pooled client (keep-alive to the upstream proxy)
+    client = request.app.state.http_client
+    async with request.app.state.upstream_semaphore:
+        return await client.send(
+            client.build_request("GET", path, headers=headers),
+            stream=True
+        )
+
+async def fetch_proxied_page(path: str, request: Request, cache_key, response: httpx.Response = None):
+    """Fetch a target URL through the upstream proxy and rewrite it for the browser"""
+    try:
+        if response is None:
+            logger.debug("🌐 PROXY: Fetching %s", path)
+            # Only the headers are read here; bodies that need rewriting are
+            # buffered per branch below, everything else is streamed through
+            response = await open_upstream(path, request)
+        
+        logger.debug("📊 Status: %s | Content-Type: %s", response.status_code, response.headers.get('content-type', 'unknown'))
+        
+        # Redirects go back to the browser through the proxy instead of being
+        # chased here, so the hop runs alongside the page's other requests
+        location = response.headers.get('location')
+        if response.is_redirect and location:
+            await response.aclose()
+            return RedirectResponse(f"/proxy/{urljoin(path, location)}", status_code=response.status_code)
+        
+        # Parse the media type once; the raw header (charset included) is what
+        # gets forwarded on pass-through responses
+        content_type = response.headers.get('content-type', '')
+        mime_type = content_type.partition(';')[0].strip().lower()
+        
+        # Handle different content types properly
+        if mime_type in ('text/html', 'application/xhtml+xml'):
+            # HTML content - process and rewrite
+            try:
+                # Buffer up to the cacheable size; larger pages are rewritten
+                # and streamed from there on instead of being held whole
+                chunks = response.aiter_bytes()
+                buffered = bytearray()
+                complete = True
+                async for chunk in chunks:
+                    buffered += chunk
+                    if len(buffered) > RESPONSE_CACHE_MAX_BODY:
+                        complete = False
+                        break
+                
+                # Some origins gzip the page without saying so, which httpx
+                # can't know to undo; the magic bytes give it away
+                if buffered[:2] == b'\x1f\x8b' and 'gzip' not in response.headers.get('content-encoding', ''):
+                    async for chunk in chunks:
+                        buffered += chunk
+                    buffered = bytearray(gzip.decompress(buffered))
+                    complete = True
+                
+                # Server-side IP replacement (aggressive) with dynamic proxy IP
+                current_proxy_ip = await get_actual_proxy_ip()
+                logger.debug("🔧 Performing server-side IP replacement with %s...", current_proxy_ip)
+                
+                # The page is rewritten as UTF-8 bytes: UTF-8/ASCII bodies are
+                # used as received, other charsets are read whole and transcoded once
+                if response.encoding.lower() in ('utf-8', 'utf8', 'ascii', 'us-ascii'):
+                    html_content = bytes(buffered)
+                else:
+                    async for chunk in chunks:
+                        buffered += chunk
+                    complete = True
+                    html_content = buffered.decode(response.encoding, errors='replace').encode('utf-8')
+                
+                if not complete:
+                    # Rewrite up to the last complete tag now; the remainder is
+                    # carried over into the streamed part
+                    cut = html_content.rfind(b'>') + 1
+                    html_content, carry = html_content[:cut], html_content[cut:]
+                
+                # Replace IPs (v4 and v6), location and ISP names in one pass
+                html_content = scrub_html(html_content, current_proxy_ip)
+                
+                logger.debug("✅ Server-side IP replacement completed")
+                
+                # MASSIVE CLIENT-SIDE IP BLOCKING - CroxyProxy Level
+                ip_blocking_script = get_ip_blocking_script(current_proxy_ip)
+                
+                # Scripts go right after <head>; GA4 and AdSense fixes only
+                # when the page needs them
+                ga4 = b'googletagmanager.com' in html_content or b'google-analytics.com' in html_content
+                adsense = b'googlesyndication.com' in html_content or b'adsbygoogle' in html_content
+                if adsense:
+                    logger.debug("📢 ADSENSE: Injected domain fix for AdSense")
+                head_inject = get_head_inject(current_proxy_ip, ga4, adsense)
+                
+                # SIMPLE, CLEAN URL rewriting - Fix broken URLs
+                proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy".encode()
+                # Every rewritten URL is root-relative, so only the page's origin matters
+                target = urlsplit(path)
+                origin = f"{target.scheme}://{target.netloc}".encode('utf-8', 'surrogateescape')
+                head_injected = False
+                
+                # Single pass: fix relative URLs that start with / and inject
+                # the scripts at the first <head>
+                def rewrite_match(m):
+                    nonlocal head_injected
+                    if m.group('srcset') is not None:
+                        quote_char = m.group('srcset_quote')
+                        return b'srcset=' + quote_char + rewrite_srcset(m.group('srcset'), origin, proxy_base) + quote_char
+                    if m.group('attr') is None:
+                        if head_injected:
+                            return m.group(0)
+                        head_injected = True
+                        return m.group(0) + head_inject
+                    quote_char = m.group('quote') or b''
+                    url = m.group('url') if quote_char else m.group('bare')
+                    rewritten = proxied_url(proxy_base, origin, url)
+                    if prefetch is not None and len(prefetch) < PREFETCH_LIMIT and url.partition(b'?')[0].endswith((b'.css', b'.js')):
+                        prefetch.append(rewritten[len(proxy_base) + 1:])
+                    return m.group('attr') + b'=' + quote_char + rewritten + quote_char
+                
+                # Stylesheets and scripts the browser is about to ask for;
+                # only collected when the page itself may use the cache
+                prefetch = [] if cache_key is not None and PREFETCH_LIMIT else None
+                processed_content = rewrite_html(html_content, rewrite_match)
+                if prefetch:
+                    prefetch_subresources(prefetch, request)
+                    prefetch = None
+                
+                if not head_injected:
+                    # A <head> further down a streamed page must not get the
+                    # scripts a second time
+                    head_injected = True
+                    # Splice after the first <html ...> only: one scan, no second
+                    # full-document replace
+                    html_open = HTML_OPEN_RE.search(processed_content)
+                    if html_open is not None:
+                        html_end = html_open.end()
+                        processed_content = b''.join((processed_content[:html_end], b'<head>', ip_blocking_script, b'</head>', processed_content[html_end:]))
+                    elif complete:
+                        processed_content = b''.join((b'<html><head>', ip_blocking_script, b'</head><body>', processed_content, b'</body></html>'))
+                    else:
+                        processed_content = b''.join((b'<head>', ip_blocking_script, b'</head>', processed_content))
+                
+                if not complete:
+                    async def stream_rest():
+                        yield processed_content
+                        pending = carry
+                        async for chunk in chunks:
+                            pending += chunk
+                            cut = pending.rfind(b'>') + 1
+                            if cut:
+                                yield rewrite_html(scrub_html(pending[:cut], current_proxy_ip), rewrite_match)
+                                pending = pending[cut:]
+                        if pending:
+                            yield rewrite_html(scrub_html(pending, current_proxy_ip), rewrite_match)
+                    
+                    return StreamingResponse(
+                        stream_rest(),
+                        media_type="text/html",
+                        headers=HTML_PROXY_HEADERS,
+                        background=BackgroundTask(response.aclose)
+                    )
+                
+                # Already UTF-8 bytes, so Starlette has nothing left to encode
+                return cache_proxied_response(cache_key, Response(
+                    content=processed_content,
+                    media_type="text/html",
+                    headers=HTML_PROXY_HEADERS
+                ), response)
+            except Exception as e:
+                logger.error("❌ HTML processing error: %s", e)
+                await response.aclose()
+                return HTMLResponse(f"<h1>Error processing HTML</h1><p>{escape(str(e))}</p>")
+        
+        elif mime_type == 'text/css':
+            # CSS content - rewrite URLs
+            # Rewritten as UTF-8 bytes like HTML: no decode unless the
+            # stylesheet uses another charset
+            css_content = await response.aread()
+            if response.encoding.lower() not in ('utf-8', 'utf8', 'ascii', 'us-ascii'):
+                css_content = css_content.decode(response.encoding, errors='replace').encode('utf-8')
+            proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy".encode()
+            
+            target = urlsplit(path)
+            origin = f"{target.scheme}://{target.netloc}".encode('utf-8', 'surrogateescape')
+            
+            def rewrite_css_match(m):
+                rewritten = rewrite_css_url(m.group(1), path, origin, proxy_base)
+                return m.group(0) if rewritten is None else b'url("' + rewritten + b'")'
+            
+            # Rewrite CSS URLs
+            if b'url(' in css_content:
+                css_content = CSS_URL_RE.sub(rewrite_css_match, css_content)
+            
+            return cache_proxied_response(cache_key, Response(
+                content=css_content,
+                media_type="text/css",
+                headers={
+                    "Access-Control-Allow-Origin": "*",
+                    "Cache-Control": "public, max-age=3600"
+                }
+            ), response)
+        
+        elif mime_type.endswith('javascript'):
+            # JavaScript content - as-is with CORS
+            return await cached_passthrough(response, request, {
+                "Content-Type": content_type or "application/octet-stream",
+                "Access-Control-Allow-Origin": "*",
+                "Cache-Control": "public, max-age=3600"
+            }, cache_key, compressible=True)
+        
+        elif mime_type == 'application/json' and 'text/html' in request.headers.get('accept', ''):
+            # JSON opened as a page - format nicely. Not cached: scripts
+            # fetching the same URL must get the raw JSON
+            await response.aread()
+            try:
+                # orjson is fast enough inline; only very large payloads are
+                # formatted on a worker thread so other requests keep flowing
+                if len(response.content) > JSON_INLINE_LIMIT:
+                    pretty_json = await asyncio.to_thread(format_json, response.content)
+                else:
+                    pretty_json = format_json(response.content)
+                return HTMLResponse(f"""
+                <!DOCTYPE html>
+                <html>
+                <head>
+                    <title>JSON Response</title>
+                    <style>
+                        body {{ font-family: Arial, sans-serif; padding: 20px; }}
+                        .status {{ position: fixed; top: 10px; right: 10px; background: #28a745; color: white; padding: 8px 12px; border-radius: 5px; }}
+                        pre {{ background: #f8f9fa; padding: 20px; border-radius: 8px; overflow: auto; }}
+                    </style>
+                </head>
+                <body>
+                    <div class="status">🇺🇸 US Proxy Active</div>
+                    <h1>Proxy Response</h1>
+                    <p><strong>URL:</strong> {escape(path)}</p>
+                    <p><strong>Status:</strong> {response.status_code}</p>
+                    <pre>{pretty_json}</pre>
+                    <button onclick="history.back()">← Back</button>
+                </body>
+                </html>
+                """, headers={"Vary": "Accept"})
+            except orjson.JSONDecodeError:
+                # Not valid JSON after all - hand it over as received
+                return Response(content=response.content, media_type=content_type)
+        
+        elif mime_type == 'application/json':
+            # JSON fetched by scripts/APIs - pass through untouched
+            return stream_passthrough(response, request, {
+                "Content-Type": content_type,
+                "Access-Control-Allow-Origin": "*"
+            })
+        
+        else:
+            # Binary content (images, etc.) - as-is; only text-like types
+            # are worth a gzip copy, images and fonts are compressed already
+            return await cached_passthrough(response, request, {
+                "Content-Type": content_type or "application/octet-stream",
+                "Access-Control-Allow-Origin": "*",
+                "Cache-Control": "public, max-age=86400"
+            }, cache_key, compressible=mime_type.startswith('text/') or mime_type.endswith('xml'))
+            
+    except Exception as e:
+        logger.error("❌ Proxy error: %s", e)
+        if response is not None:
+            # Streamed bodies are not released until read or closed
+            await response.aclose()
+        return Response(
+            content=b''.join((
+                PROXY_ERROR_HTML_HEAD, str(escape(str(e))).encode(),
+                PROXY_ERROR_HTML_MIDDLE, str(escape(path)).encode(),
+                PROXY_ERROR_HTML_TAIL
+            )),
+            status_code=502,
+            media_type="text/html"
+        )
+
+# Raced by /proxy-first when no url is given: the landing page's demo sites
+PROXY_FIRST_DEFAULT_SITES = ("https://example.com", "https://httpbin.org/ip", "https://ybsq.xyz")
+
+@app.get("/proxy-first")
+async def proxy_first(request: Request, url: List[str] = Query(default=[])):
+    """Fetch several targets concurrently and proxy the first one that answers
+    successfully, so one stalled upstream doesn't hold up the page"""
+    # Every candidate must be one /proxy/ would accept, or nothing is fetched
+    targets = [normalize_target_url(target) for target in url or PROXY_FIRST_DEFAULT_SITES]
+    if not targets or None in targets:
+        return INVALID_URL_RESPONSE
+    
+    tasks = {asyncio.create_task(open_upstream(target, request)): target for target in targets}
+    pending = set(tasks)
+    winner = None
+    error = "no upstream answered successfully"
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = str(task.exception())
+                    logger.debug("🏁 RACE: %s failed: %s", tasks[task], error)
+                    continue
+                upstream = task.result()
+                if winner is None and (upstream.is_success or upstream.is_redirect):
+                    winner = task
+                else:
+                    error = f"{tasks[task]} answered {upstream.status_code}"
+                    await upstream.aclose()
+    finally:
+        # Losers are cancelled; any that finished meanwhile still hold a connection
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, httpx.Response):
+                await result.aclose()
+    
+    if winner is None:
+        logger.warning("🏁 RACE: No winner among %s", targets)
+        return Response(
+            content=b''.join((
+                PROXY_ERROR_HTML_HEAD, str(escape(error)).encode(),
+                PROXY_ERROR_HTML_MIDDLE, str(escape(', '.join(targets))).encode(),
+                PROXY_ERROR_HTML_TAIL
+            )),
+            status_code=502,
+            media_type="text/html"
+        )
+    
+    logger.debug("🏁 RACE: %s answered first", tasks[winner])
+    # Not cached: which target wins changes from request to request
+    return await fetch_proxied_page(tasks[winner], request, None, winner.result())
 
 # NETWORK-LEVEL IP BLOCKING - CroxyProxy Style
 # Block ALL possible IP detection APIs at server level
@@ -1439,7 +1768,7 @@ async def proxy_page(path: str, request: Request):
 async def block_ip_detection_network():
     """Block ALL IP detection APIs at network level - CroxyProxy style"""
     proxy_ip = await get_actual_proxy_ip()
-    print(f"🚫 NETWORK BLOCK: IP detection API blocked, returning US data with IP: {proxy_ip}")
+    logger.debug("🚫 NETWORK BLOCK: IP detection API blocked, returning US data with IP: %s", proxy_ip)
     
     return {
         "ip": proxy_ip,
@@ -1473,7 +1802,7 @@ async def handle_external_ip_services(service: str):
     proxy_ip = await get_actual_proxy_ip()
     
     if service.lower() in ['ipapi', 'ipify', 'ipinfo', 'geoip', 'whatismyip', 'httpbin']:
-        print(f"🚫 EXTERNAL BLOCK: {service} blocked, returning US data")
+        logger.debug("🚫 EXTERNAL BLOCK: %s blocked, returning US data", service)
         return {
             "ip": proxy_ip,
             "country": "United States", 
@@ -1488,4 +1817,16 @@ async def handle_external_ip_services(service: str):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run(
+        # Workers need an import string; "app:app" would resolve to the app/ package
+        "__main__:app" if workers > 1 else app,
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="auto",  # uvloop when installed (uvicorn[standard], not on Windows)
+        http="auto",  # httptools when installed
+        limit_concurrency=int(os.environ.get("LIMIT_CONCURRENCY", 1000)),  # 503 instead of unbounded queueing
+        timeout_keep_alive=30,  # reuse browser connections across subresource bursts
+        access_log=False
+    )
@@ -22,7 +22,7 @@ async def handle_ga4_event(request: Request):
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
         # Log GA4 event with spoofed location
-        logger.info(f"GA4 Event from session {session_id}: {data.get('event_name')}")
+        logger.debug("GA4 Event from session {}: {}", session_id, data.get('event_name'))
         
         # Modify event data to include proxy location
         modified_data = {
@@ -36,7 +36,7 @@ async def handle_ga4_event(request: Request):
         
         # Forward to actual GA4 if measurement ID provided
         if data.get('measurement_id'):
-            await forward_to_ga4(modified_data)
+            await forward_to_ga4(request.app.state.analytics_client, modified_data)
         
         return JSONResponse(content={
             "status": "tracked",
@@ -56,7 +56,7 @@ async def handle_gtag_event(request: Request):
         data = await request.json()
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
-        logger.info(f"GTM Event from session {session_id}: {data}")
+        logger.debug("GTM Event from session {}: {}", session_id, data)
         
         # Process and modify event
         modified_data = process_gtm_event(data, request.app.state.settings)
@@ -79,7 +79,7 @@ async def handle_adsense_event(request: Request):
         data = await request.json()
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
-        logger.info(f"AdSense Event from session {session_id}")
+        logger.debug("AdSense Event from session {}", session_id)
         
         # AdSense will use proxy IP automatically
         # Log for monitoring
@@ -109,7 +109,7 @@ async def handle_facebook_pixel(request: Request):
         data = await request.json()
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
-        logger.info(f"FB Pixel Event from session {session_id}: {data.get('event')}")
+        logger.debug("FB Pixel Event from session {}: {}", session_id, data.get('event'))
         
         # Modify event data for proxy location
         modified_data = {
@@ -123,7 +123,7 @@ async def handle_facebook_pixel(request: Request):
         
         # Forward to Facebook if pixel ID provided
         if data.get('pixel_id'):
-            await forward_to_facebook(modified_data)
+            await forward_to_facebook(request.app.state.analytics_client, modified_data)
         
         return JSONResponse(content={
             "status": "tracked",
@@ -147,7 +147,7 @@ async def handle_mixpanel_event(request: Request):
         data = await request.json()
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
-        logger.info(f"Mixpanel Event from session {session_id}: {data.get('event')}")
+        logger.debug("Mixpanel Event from session {}: {}", session_id, data.get('event'))
         
         # Add proxy location to properties
         properties = data.get("properties", {})
@@ -182,7 +182,7 @@ async def handle_hotjar_event(request: Request):
         data = await request.json()
         session_id = request.headers.get('X-Session-ID', 'unknown')
         
-        logger.info(f"Hotjar Event from session {session_id}")
+        logger.debug("Hotjar Event from session {}", session_id)
         
         # Hotjar will use proxy IP for location
         return JSONResponse(content={
@@ -207,7 +207,7 @@ async def handle_custom_analytics(request: Request):
         tracker_name = data.get("tracker", "unknown")
         event_name = data.get("event", "unknown")
         
-        logger.info(f"Custom Event [{tracker_name}] from session {session_id}: {event_name}")
+        logger.debug("Custom Event [{}] from session {}: {}", tracker_name, session_id, event_name)
         
         # Add proxy information
         modified_data = {
@@ -262,7 +262,7 @@ async def get_analytics_stats(request: Request):
 
 # Helper functions
 
-async def forward_to_ga4(data: Dict[str, Any]):
+async def forward_to_ga4(client: httpx.AsyncClient, data: Dict[str, Any]):
     """Forward event to actual GA4"""
     
     try:
@@ -279,20 +279,19 @@ async def forward_to_ga4(data: Dict[str, Any]):
         }
         
         # Send to GA4
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                params={"measurement_id": data.get("measurement_id")},
-                json=payload
-            )
-            
+        response = await client.post(
+            url,
+            params={"measurement_id": data.get("measurement_id")},
+            json=payload
+        )
+        
         logger.debug(f"Forwarded to GA4: {response.status_code}")
         
     except Exception as e:
         logger.error(f"GA4 forwarding error: {str(e)}")
 
 
-async def forward_to_facebook(data: Dict[str, Any]):
+async def forward_to_facebook(client: httpx.AsyncClient, data: Dict[str, Any]):
     """Forward event to Facebook Pixel"""
     
     try:
@@ -310,13 +309,12 @@ async def forward_to_facebook(data: Dict[str, Any]):
         }
         
         # Send to Facebook
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                params={"access_token": data.get("access_token")},
-                json=payload
-            )
-            
+        response = await client.post(
+            url,
+            params={"access_token": data.get("access_token")},
+            json=payload
+        )
+        
         logger.debug(f"Forwarded to Facebook: {response.status_code}")
         
     except Exception as e:
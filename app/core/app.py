@@ -10,8 +10,10 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from contextlib import asynccontextmanager
 import asyncio
+from pathlib import Path
 from typing import Dict, Optional
 import uuid
+import httpx
 from loguru import logger
 import json
 
@@ -19,7 +21,7 @@ from config.settings import get_settings
 from app.core.websocket_manager import WebSocketManager
 from app.services.proxy_service import ProxyService
 from app.services.simple_proxy import SimpleProxyService
-from app.services.direct_proxy import DirectProxyService
+from app.services.direct_proxy import DirectProxyService, IPV4_RE, IPV6_RE, PROXIED_URL_PARAM_RE
 # from app.services.browser_pool import BrowserPoolManager  # Disabled for Railway
 from app.services.session_manager import SessionManager
 from app.services.content_rewriter import ContentRewriter
@@ -37,6 +39,16 @@ proxy_service: Optional[ProxyService] = None
 simple_proxy: Optional[SimpleProxyService] = None
 direct_proxy: Optional[DirectProxyService] = None
 
+# Directories the app writes to or serves from at runtime
+RUNTIME_DIRS = (Path("logs"), Path("app/static"))
+
+
+def ensure_runtime_dirs():
+    """Create missing runtime directories (skips the syscall when they exist)"""
+    for path in RUNTIME_DIRS:
+        if not path.exists():
+            path.mkdir(parents=True, exist_ok=True)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -45,6 +57,13 @@ async def lifespan(app: FastAPI):
     
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     
+    # Filesystem setup happens once per worker start, off the event loop
+    await asyncio.to_thread(ensure_runtime_dirs)
+    
+    # One pooled client for analytics forwarding instead of one per event;
+    # created before the managers so a failed startup still leaves it in place
+    app.state.analytics_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0))
+    
     try:
         # Initialize managers (simplified for Railway)
         ws_manager = WebSocketManager()
@@ -78,10 +97,16 @@ async def lifespan(app: FastAPI):
     # Cleanup on shutdown
     logger.info("Shutting down application...")
     try:
-        await session_manager.cleanup()
-        await ws_manager.disconnect_all()
+        # Either manager is still None if startup failed before creating it
+        if session_manager is not None:
+            await session_manager.cleanup()
+        if ws_manager is not None:
+            await ws_manager.disconnect_all()
     except Exception as e:
         logger.warning(f"Shutdown warning: {e}")
+    finally:
+        # Close the pooled analytics client even if the cleanup above failed
+        await app.state.analytics_client.aclose()
     logger.info("Application shutdown complete")
 
 
@@ -121,7 +146,8 @@ def create_app() -> FastAPI:
         )
     
     # Mount static files
-    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    # The directory is created in lifespan, so don't require it at import time
+    app.mount("/static", StaticFiles(directory="app/static", check_dir=False), name="static")
     
     # Include API routes
     app.include_router(proxy_routes.router, prefix="/api/proxy", tags=["proxy"])
@@ -228,8 +254,7 @@ def create_app() -> FastAPI:
             
             # Extract actual URL if it's a proxied URL
             if url and ('localhost' in url or '/api/direct-proxy/' in url):
-                import re
-                match = re.search(r'url=([^&]+)', url)
+                match = PROXIED_URL_PARAM_RE.search(url)
                 if match:
                     from urllib.parse import unquote
                     original_url = unquote(match[1])
@@ -254,13 +279,8 @@ def create_app() -> FastAPI:
                         content = f"<html><body><p>Binary content cannot be displayed</p></body></html>"
                 
                 # Extra aggressive IP replacement before sending
-                import re
-                ipv4_pattern = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'
-                ipv6_pattern = r'(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}'
-                
-                # Replace all IPs
-                content = re.sub(ipv4_pattern, '104.28.246.156', content)
-                content = re.sub(ipv6_pattern, '104.28.246.156', content)
+                content = IPV4_RE.sub('104.28.246.156', content)
+                content = IPV6_RE.sub('104.28.246.156', content)
                 
                 logger.info(f"Sending content to websocket, length: {len(content)}")
                 logger.debug(f"Content preview: {content[:200]}...")
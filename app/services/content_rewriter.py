@@ -11,6 +11,14 @@ import base64
 from bs4 import BeautifulSoup, Comment
 from loguru import logger
 
+# Patterns compiled once at import instead of on every rewrite
+CSS_URL_RE = re.compile(r'url\((.*?)\)')
+CSS_IMPORT_RE = re.compile(r'@import\s+["\']([^"\']+)["\']')
+CSS_IMPORT_URL_RE = re.compile(r'@import\s+url\((.*?)\)')
+GA_SCRIPT_RE = re.compile('gtag|google-analytics|googletagmanager')
+ADSENSE_SRC_RE = re.compile('googlesyndication')
+FB_PIXEL_SCRIPT_RE = re.compile(r'fbq|facebook\.com/tr')
+
 
 class ContentRewriter:
     """Rewrites web content to work through proxy with geographic spoofing"""
@@ -47,6 +55,12 @@ class ContentRewriter:
                 r'mixpanel\.track'
             ]
         }
+        # One case-insensitive alternation per tracker, so detection is a
+        # single scan each instead of one per pattern
+        self.tracker_regexes = {
+            name: re.compile('|'.join(patterns), re.IGNORECASE)
+            for name, patterns in self.tracker_patterns.items()
+        }
     
     async def rewrite_html(
         self,
@@ -370,7 +384,7 @@ class ContentRewriter:
         """Handle Google Analytics/GA4 tracking"""
         
         # Find all GA scripts
-        ga_scripts = soup.find_all('script', string=re.compile('gtag|google-analytics|googletagmanager'))
+        ga_scripts = soup.find_all('script', string=GA_SCRIPT_RE)
         
         for script in ga_scripts:
             if script.string:
@@ -392,7 +406,7 @@ class ContentRewriter:
         """Handle Google AdSense"""
         
         # Find AdSense scripts
-        adsense_scripts = soup.find_all('script', src=re.compile('googlesyndication'))
+        adsense_scripts = soup.find_all('script', src=ADSENSE_SRC_RE)
         
         for script in adsense_scripts:
             # Add data attributes for tracking
@@ -408,7 +422,7 @@ class ContentRewriter:
         """Handle Facebook Pixel"""
         
         # Find FB pixel scripts
-        fb_scripts = soup.find_all('script', string=re.compile('fbq|facebook\.com/tr'))
+        fb_scripts = soup.find_all('script', string=FB_PIXEL_SCRIPT_RE)
         
         for script in fb_scripts:
             if script.string:
@@ -540,7 +554,7 @@ class ContentRewriter:
             return f'url("{proxy_url}")'
         
         # Replace url() declarations
-        css = re.sub(r'url\((.*?)\)', replace_url, css)
+        css = CSS_URL_RE.sub(replace_url, css)
         
         # Replace @import statements
         def replace_import(match):
@@ -548,8 +562,8 @@ class ContentRewriter:
             proxy_url = self._create_proxy_url(url, base_url)
             return f'@import "{proxy_url}"'
         
-        css = re.sub(r'@import\s+["\']([^"\']+)["\']', replace_import, css)
-        css = re.sub(r'@import\s+url\((.*?)\)', replace_import, css)
+        css = CSS_IMPORT_RE.sub(replace_import, css)
+        css = CSS_IMPORT_URL_RE.sub(replace_import, css)
         
         return css
     
@@ -696,11 +710,8 @@ class ContentRewriter:
         detected = {}
         html_str = str(soup)
         
-        for tracker_name, patterns in self.tracker_patterns.items():
-            detected[tracker_name] = any(
-                re.search(pattern, html_str, re.IGNORECASE)
-                for pattern in patterns
-            )
+        for tracker_name, regex in self.tracker_regexes.items():
+            detected[tracker_name] = regex.search(html_str) is not None
         
         return detected
     
@@ -13,6 +13,30 @@ from bs4 import BeautifulSoup
 
 from config.settings import Settings, ProxyConfig
 
+# IP scrubbing patterns, compiled once at import
+IPV4_PATTERN = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'
+IPV4_RE = re.compile(IPV4_PATTERN)
+IPV6_RE = re.compile(r'(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}')
+# Original target carried in a proxied URL's url= query parameter
+PROXIED_URL_PARAM_RE = re.compile(r'url=([^&]+)')
+IP_DISPLAY_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in [
+        # Common text patterns
+        (r'(IP\s*(?:Address)?:?\s*)' + IPV4_PATTERN, r'\g<1>104.28.246.156'),
+        (r'(Your\s+IP:?\s*)' + IPV4_PATTERN, r'\g<1>104.28.246.156'),
+        (r'(Location:.*?)([\d.]{7,15})', r'\g<1>104.28.246.156'),
+        # JSON/JavaScript patterns
+        (r'"ip"\s*:\s*"([\d.]+)"', '"ip": "104.28.246.156"'),
+        (r'\'ip\'\s*:\s*\'([\d.]+)\'', "'ip': '104.28.246.156'"),
+        (r'ip["\']?\s*:\s*["\']?([\d.]+)', 'ip: "104.28.246.156"'),
+        # HTML attributes
+        (r'data-ip="[\d.]+"', 'data-ip="104.28.246.156"'),
+        (r'data-ip=\'[\d.]+\'', "data-ip='104.28.246.156'"),
+        # PHP patterns
+        (r'\$_SERVER\[[\'"]REMOTE_ADDR[\'"]\]\s*=\s*[\'"][\d.]+[\'"]', '$_SERVER["REMOTE_ADDR"] = "104.28.246.156"'),
+    ]
+]
+
 
 class DirectProxyService:
     """Direct proxy service using httpx"""
@@ -52,7 +76,7 @@ class DirectProxyService:
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
                     "Accept-Language": self.settings.spoof_language,
-                    "Accept-Encoding": "gzip, deflate",
+                    "Accept-Encoding": "gzip, deflate, br",
                     "DNT": "1",
                     "Connection": "keep-alive",
                     "Upgrade-Insecure-Requests": "1",
@@ -494,8 +518,7 @@ class DirectProxyService:
         # If we're already looking at a proxied URL, extract the original URL
         if 'localhost' in parsed_base.netloc or '/api/direct-proxy/' in base_url:
             # Extract original URL from query params
-            import re
-            match = re.search(r'url=([^&]+)', base_url)
+            match = PROXIED_URL_PARAM_RE.search(base_url)
             if match:
                 from urllib.parse import unquote
                 original_url = unquote(match.group(1))
@@ -561,7 +584,7 @@ class DirectProxyService:
         
         try:
             client = await self.get_client(session_id)
-            logger.info(f"Fetching {url} with method {method} for session {session_id}")
+            logger.debug("Fetching {} with method {} for session {}", url, method, session_id)
             
             # Add extra headers for the actual request
             request_headers = {
@@ -588,11 +611,6 @@ class DirectProxyService:
                     # Still process it normally so user can see what's happening
                 
                 # Replace any server-side IP detection results in the HTML
-                import re
-                # Find both IPv4 and IPv6 addresses
-                ipv4_pattern = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'
-                ipv6_pattern = r'(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}'
-                
                 def replace_ip(match):
                     ip = match.group(0)
                     if ip != '104.28.246.156':
@@ -600,30 +618,14 @@ class DirectProxyService:
                         return '104.28.246.156'
                     return ip
                 
-                # Replace both IPv4 and IPv6 multiple times to catch all instances
-                for _ in range(5):  # Run multiple times in case of nested replacements
-                    html = re.sub(ipv4_pattern, replace_ip, html)
-                    html = re.sub(ipv6_pattern, replace_ip, html)
+                # Replace both IPv4 and IPv6; replace_ip leaves the proxy IP
+                # as-is, so a single pass catches every instance
+                html = IPV4_RE.sub(replace_ip, html)
+                html = IPV6_RE.sub(replace_ip, html)
                 
                 # Replace various IP display patterns
-                ip_patterns = [
-                    # Common text patterns
-                    (r'(IP\s*(?:Address)?:?\s*)' + ipv4_pattern, r'\g<1>104.28.246.156'),
-                    (r'(Your\s+IP:?\s*)' + ipv4_pattern, r'\g<1>104.28.246.156'),
-                    (r'(Location:.*?)([\d.]{7,15})', r'\g<1>104.28.246.156'),
-                    # JSON/JavaScript patterns
-                    (r'"ip"\s*:\s*"([\d.]+)"', '"ip": "104.28.246.156"'),
-                    (r'\'ip\'\s*:\s*\'([\d.]+)\'', "'ip': '104.28.246.156'"),
-                    (r'ip["\']?\s*:\s*["\']?([\d.]+)', 'ip: "104.28.246.156"'),
-                    # HTML attributes
-                    (r'data-ip="[\d.]+"', 'data-ip="104.28.246.156"'),
-                    (r'data-ip=\'[\d.]+\'', "data-ip='104.28.246.156'"),
-                    # PHP patterns
-                    (r'\$_SERVER\[[\'"]REMOTE_ADDR[\'"]\]\s*=\s*[\'"][\d.]+[\'"]', '$_SERVER["REMOTE_ADDR"] = "104.28.246.156"'),
-                ]
-                
-                for pattern, replacement in ip_patterns:
-                    html = re.sub(pattern, replacement, html, flags=re.IGNORECASE)
+                for pattern, replacement in IP_DISPLAY_PATTERNS:
+                    html = pattern.sub(replacement, html)
                 
                 rewritten_html = self._rewrite_urls(html, url, session_id)
                 
@@ -22,6 +22,8 @@ except ImportError:
 
 from config.settings import Settings, ProxyConfig
 
+# CSS url(...) references, compiled once at import
+CSS_URL_RE = re.compile(r'url\((.*?)\)')
 
 class ProxyService:
     """Main proxy service for handling requests and responses"""
@@ -372,7 +374,7 @@ class ProxyService:
             url = match.group(1).strip('\'"')
             return f'url("{self._rewrite_url(url, base_url)}")'
         
-        return re.sub(r'url\((.*?)\)', replace_url, css)
+        return CSS_URL_RE.sub(replace_url, css)
     
     async def _process_javascript(self, js: str, url: str, session_id: str) -> str:
         """Process JavaScript content"""
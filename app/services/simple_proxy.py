@@ -70,7 +70,7 @@ class SimpleProxyService:
                 request_headers.update(headers)
             
             # Make request
-            logger.info(f"Fetching {url} for session {session_id}")
+            logger.debug("Fetching {} for session {}", url, session_id)
             response = await client.get(url, headers=request_headers)
             
             # Process response
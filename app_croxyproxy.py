@@ -1,442 +0,0 @@
-import os
-import sys
-import re
-import json
-import base64
-from pathlib import Path
-from urllib.parse import quote, unquote, urljoin, urlparse
-from fastapi import FastAPI, Request, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
-import httpx
-import asyncio
-
-app = FastAPI(title="Proxy Browser V2 - CroxyProxy Style")
-
-# Proxy configuration
-PROXY_CONFIG = {
-    "server": os.environ.get("PROXY_SERVER", "pg.proxi.es:20000"),
-    "username": os.environ.get("PROXY_USERNAME", "KMwYgm4pR4upF6yX"),
-    "password": os.environ.get("PROXY_PASSWORD", "pMBwu34BjjGr5urD"),
-    "country": os.environ.get("PROXY_COUNTRY", "USA"),
-    "timezone": os.environ.get("SPOOF_TIMEZONE", "America/New_York"),
-    "language": os.environ.get("SPOOF_LANGUAGE", "en-US"),
-    "target_url": os.environ.get("DEFAULT_TARGET_URL", "https://ybsq.xyz/")
-}
-
-def get_proxy_url():
-    return f"http://{PROXY_CONFIG['username']}:{PROXY_CONFIG['password']}@{PROXY_CONFIG['server']}"
-
-def get_spoofed_headers(original_request: Request, target_url: str):
-    """Get headers with US location spoofing while preserving original User-Agent"""
-    headers = {}
-    
-    # Preserve original headers but modify location-related ones
-    for name, value in original_request.headers.items():
-        if name.lower() not in ['host', 'connection', 'content-length', 'transfer-encoding']:
-            headers[name] = value
-    
-    # Override location-related headers with US data
-    headers.update({
-        "Accept-Language": "en-US,en;q=0.9",
-        "X-Forwarded-For": "8.8.8.8",
-        "CF-IPCountry": "US",
-        "X-Real-IP": "8.8.8.8",
-        "X-Forwarded-Proto": "https",
-        "X-Appengine-Country": "US",
-        "X-Appengine-Region": "ny",
-        "X-Appengine-City": "newyork",
-        "Accept-Encoding": "gzip, deflate",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache"
-    })
-    
-    return headers
-
-def rewrite_html_content(content: str, base_url: str, proxy_base: str):
-    """Rewrite HTML content like CroxyProxy"""
-    
-    # Parse base URL
-    parsed_base = urlparse(base_url)
-    domain = f"{parsed_base.scheme}://{parsed_base.netloc}"
-    
-    # Rewrite absolute URLs
-    content = re.sub(
-        r'(href|src|action)=(["\'])https?://([^"\']+)\2',
-        rf'\1=\2{proxy_base}/\3\2',
-        content
-    )
-    
-    # Rewrite protocol-relative URLs
-    content = re.sub(
-        r'(href|src|action)=(["\'])//([^"\']+)\2',
-        rf'\1=\2{proxy_base}/https://\3\2',
-        content
-    )
-    
-    # Rewrite relative URLs
-    content = re.sub(
-        r'(href|src|action)=(["\'])(?!http|//|#|mailto:|tel:|javascript:)([^"\']+)\2',
-        rf'\1=\2{proxy_base}/{domain}/\3\2',
-        content
-    )
-    
-    # Add comprehensive spoofing script
-    spoof_script = f"""
-    <script>
-    // CroxyProxy-style spoofing
-    console.log('🇺🇸 CROXYPROXY: Initializing location spoofing...');
-    
-    // Override geolocation
-    if (navigator.geolocation) {{
-        const fakePosition = {{
-            coords: {{
-                latitude: 40.7128,
-                longitude: -74.0060,
-                accuracy: 10,
-                altitude: null,
-                altitudeAccuracy: null,
-                heading: null,
-                speed: null
-            }},
-            timestamp: Date.now()
-        }};
-        
-        navigator.geolocation.getCurrentPosition = function(success, error, options) {{
-            console.log('🇺🇸 CROXYPROXY: Spoofing getCurrentPosition');
-            if (success) setTimeout(() => success(fakePosition), 100);
-        }};
-        
-        navigator.geolocation.watchPosition = function(success, error, options) {{
-            console.log('🇺🇸 CROXYPROXY: Spoofing watchPosition');
-            if (success) setTimeout(() => success(fakePosition), 100);
-            return 1;
-        }};
-    }}
-    
-    // Override timezone
-    Date.prototype.getTimezoneOffset = function() {{
-        return 300; // EST
-    }};
-    
-    // Override Intl
-    const originalDateTimeFormat = Intl.DateTimeFormat;
-    Intl.DateTimeFormat = function(locale, options) {{
-        return new originalDateTimeFormat('en-US', {{...options, timeZone: 'America/New_York'}});
-    }};
-    
-    // Override navigator properties
-    Object.defineProperty(navigator, 'language', {{
-        get: () => 'en-US',
-        configurable: true
-    }});
-    
-    Object.defineProperty(navigator, 'languages', {{
-        get: () => ['en-US', 'en'],
-        configurable: true
-    }});
-    
-    // Override fetch for analytics
-    const originalFetch = window.fetch;
-    window.fetch = function(url, options = {{}}) {{
-        const urlStr = url.toString();
-        
-        // Add US headers to all analytics requests
-        if (urlStr.includes('google') || urlStr.includes('analytics') || urlStr.includes('adsense')) {{
-            console.log('🇺🇸 CROXYPROXY: Adding US headers to analytics');
-            options.headers = {{
-                ...options.headers,
-                'CF-IPCountry': 'US',
-                'X-Forwarded-For': '8.8.8.8',
-                'Accept-Language': 'en-US,en;q=0.9'
-            }};
-        }}
-        
-        return originalFetch.call(this, url, options);
-    }};
-    
-    // Text replacement
-    function replaceLocationText() {{
-        const walker = document.createTreeWalker(
-            document.body || document.documentElement,
-            NodeFilter.SHOW_TEXT
-        );
-        
-        let node;
-        while (node = walker.nextNode()) {{
-            if (node.textContent) {{
-                let text = node.textContent;
-                let changed = false;
-                
-                if (text.includes('India')) {{
-                    text = text.replace(/India/g, 'United States');
-                    changed = true;
-                }}
-                if (text.includes('Bhubaneswar')) {{
-                    text = text.replace(/Bhubaneswar/g, 'New York');
-                    changed = true;
-                }}
-                if (text.includes('Asia/Calcutta')) {{
-                    text = text.replace(/Asia\/Calcutta/g, 'America/New_York');
-                    changed = true;
-                }}
-                
-                if (changed) {{
-                    node.textContent = text;
-                    console.log('🇺🇸 CROXYPROXY: Replaced location text');
-                }}
-            }}
-        }}
-    }}
-    
-    // Run replacements
-    if (document.readyState === 'loading') {{
-        document.addEventListener('DOMContentLoaded', replaceLocationText);
-    }} else {{
-        replaceLocationText();
-    }}
-    
-    // Monitor for changes
-    if (window.MutationObserver) {{
-        new MutationObserver(() => setTimeout(replaceLocationText, 100))
-            .observe(document.body || document.documentElement, {{
-                childList: true,
-                subtree: true,
-                characterData: true
-            }});
-    }}
-    
-    console.log('🇺🇸 CROXYPROXY: Location spoofing initialized');
-    </script>
-    """
-    
-    # Inject script and meta tags
-    meta_viewport = '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
-    
-    if '<head>' in content:
-        content = content.replace('<head>', f'<head>{meta_viewport}{spoof_script}')
-    elif '<html>' in content:
-        content = content.replace('<html>', f'<html><head>{meta_viewport}{spoof_script}</head>')
-    else:
-        content = f'<html><head>{meta_viewport}{spoof_script}</head><body>{content}</body></html>'
-    
-    # Add status indicator
-    status_div = '<div style="position:fixed;top:10px;right:10px;background:#28a745;color:white;padding:8px 12px;border-radius:5px;z-index:999999;font-size:12px;font-family:Arial;">🇺🇸 US Proxy Active</div>'
-    content = content.replace('<body', f'<body>{status_div}')
-    
-    return content
-
-@app.get("/")
-async def root():
-    return HTMLResponse("""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Proxy Browser V2</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            body { 
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                margin: 0;
-                padding: 20px;
-            }
-            .container {
-                background: white;
-                padding: 40px;
-                border-radius: 15px;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                text-align: center;
-                max-width: 500px;
-                width: 100%;
-            }
-            h1 { color: #333; margin-bottom: 10px; }
-            p { color: #666; margin-bottom: 30px; }
-            .btn {
-                background: linear-gradient(135deg, #667eea, #764ba2);
-                color: white;
-                border: none;
-                padding: 15px 30px;
-                border-radius: 25px;
-                font-size: 16px;
-                cursor: pointer;
-                transition: transform 0.2s;
-            }
-            .btn:hover { transform: translateY(-2px); }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🌐 Proxy Browser V2</h1>
-            <p>Browse with US IP address and location</p>
-            <button class="btn" onclick="window.location.href='/proxy/https://ybsq.xyz/'">
-                Start Browsing
-            </button>
-        </div>
-    </body>
-    </html>
-    """)
-
-@app.get("/ping")
-def ping():
-    return {"pong": True}
-
-@app.get("/health")
-def health():
-    return {"status": "healthy", "service": "proxy-browser-v2"}
-
-@app.get("/proxy/{path:path}")
-async def proxy_page(path: str, request: Request):
-    try:
-        # Decode URL
-        path = unquote(path)
-        
-        # Ensure proper URL format
-        if not path.startswith(('http://', 'https://')):
-            path = 'https://' + path
-        
-        print(f"🌐 PROXY: Fetching {path}")
-        
-        # Get spoofed headers
-        headers = get_spoofed_headers(request, path)
-        
-        # Create proxy client
-        proxy_url = get_proxy_url()
-        
-        async with httpx.AsyncClient(
-            proxies={"http://": proxy_url, "https://": proxy_url},
-            timeout=30.0,
-            verify=False,
-            follow_redirects=True
-        ) as client:
-            response = await client.get(path, headers=headers)
-            
-            print(f"📊 Status: {response.status_code} | Content-Type: {response.headers.get('content-type', 'unknown')}")
-            
-            content_type = response.headers.get('content-type', '').lower()
-            
-            # Handle different content types properly
-            if 'text/html' in content_type:
-                # HTML content - process and rewrite
-                try:
-                    html_content = response.text
-                    
-                    # Rewrite content like CroxyProxy
-                    proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy"
-                    processed_content = rewrite_html_content(html_content, path, proxy_base)
-                    
-                    return HTMLResponse(
-                        content=processed_content,
-                        headers={
-                            "Access-Control-Allow-Origin": "*",
-                            "X-Frame-Options": "ALLOWALL",
-                            "Content-Security-Policy": "default-src * 'unsafe-inline' 'unsafe-eval' data: blob:;"
-                        }
-                    )
-                except Exception as e:
-                    print(f"❌ HTML processing error: {e}")
-                    return HTMLResponse(f"<h1>Error processing HTML</h1><p>{str(e)}</p>")
-            
-            elif 'text/css' in content_type:
-                # CSS content - rewrite URLs
-                css_content = response.text
-                proxy_base = f"https://{request.headers.get('host', 'scrap.ybsq.xyz')}/proxy"
-                
-                # Rewrite CSS URLs
-                css_content = re.sub(
-                    r'url\(["\']?([^"\'\\)]+)["\']?\)',
-                    rf'url("{proxy_base}/\1")',
-                    css_content
-                )
-                
-                return Response(
-                    content=css_content,
-                    media_type="text/css",
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                )
-            
-            elif 'javascript' in content_type:
-                # JavaScript content - return as-is with CORS
-                return Response(
-                    content=response.content,
-                    media_type=content_type,
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                )
-            
-            elif 'application/json' in content_type:
-                # JSON content - format nicely
-                try:
-                    json_data = response.json()
-                    return HTMLResponse(f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>JSON Response</title>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; padding: 20px; }}
-                            .status {{ position: fixed; top: 10px; right: 10px; background: #28a745; color: white; padding: 8px 12px; border-radius: 5px; }}
-                            pre {{ background: #f8f9fa; padding: 20px; border-radius: 8px; overflow: auto; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="status">🇺🇸 US Proxy Active</div>
-                        <h1>Proxy Response</h1>
-                        <p><strong>URL:</strong> {path}</p>
-                        <p><strong>Status:</strong> {response.status_code}</p>
-                        <pre>{json.dumps(json_data, indent=2)}</pre>
-                        <button onclick="history.back()">← Back</button>
-                    </body>
-                    </html>
-                    """)
-                except:
-                    return Response(content=response.content, media_type=content_type)
-            
-            else:
-                # Binary content (images, etc.) - return as-is
-                return Response(
-                    content=response.content,
-                    media_type=content_type,
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=86400"
-                    }
-                )
-                
-    except Exception as e:
-        print(f"❌ Proxy error: {str(e)}")
-        return HTMLResponse(f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Proxy Error</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; text-align: center; padding: 50px; }}
-                .error {{ background: #f8d7da; color: #721c24; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-            </style>
-        </head>
-        <body>
-            <h1>🌐 Proxy Browser V2</h1>
-            <div class="error">
-                <h3>Connection Error</h3>
-                <p><strong>Error:</strong> {str(e)}</p>
-                <p><strong>URL:</strong> {path}</p>
-            </div>
-            <button onclick="history.back()">← Back</button>
-            <button onclick="window.location.href='/'">🏠 Home</button>
-        </body>
-        </html>
-        """)
-
-if __name__ == "__main__":
-    import uvicorn
-    port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -56,10 +56,6 @@ def main():
     logger.info(f"  • Spoof Timezone: {settings.spoof_timezone}")
     logger.info(f"  • Debug Mode: {settings.debug}")
     
-    # Create required directories
-    Path("logs").mkdir(exist_ok=True)
-    Path("app/static").mkdir(parents=True, exist_ok=True)
-    
     # Run the application
     uvicorn.run(
         "app.core.app:app",
@@ -68,7 +64,7 @@ def main():
         reload=settings.reload or settings.hot_reload,
         workers=1 if settings.reload else settings.workers,
         log_level=settings.log_level.lower(),
-        access_log=True
+        access_log=settings.debug  # one stdout write per request otherwise; keep for debugging
     )
 
 if __name__ == "__main__":
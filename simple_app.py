@@ -1,22 +0,0 @@
-from fastapi import FastAPI
-import os
-
-app = FastAPI()
-
-@app.get("/")
-def read_root():
-    return {"Hello": "World", "service": "proxy-browser-v2"}
-
-@app.get("/ping")
-def ping():
-    return {"pong": True}
-
-@app.get("/health")
-def health():
-    return {"status": "healthy"}
-
-# For direct execution
-if __name__ == "__main__":
-    import uvicorn
-    port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
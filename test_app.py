@@ -0,0 +1,346 @@
+"""
+Tests for the standalone proxy in app.py, with upstream traffic served by
+an httpx mock transport instead of the residential proxy
+"""
+
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+# `import app` would pick up the app/ package, so load the module by path
+spec = importlib.util.spec_from_file_location("proxy_app", Path(__file__).parent / "app.py")
+proxy_app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(proxy_app)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the app's upstream client to a handler table and record every request it sends"""
+    routes = {}
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request)
+        route = routes.get(request.url.path)
+        if route is None:
+            return httpx.Response(404, text="not found")
+        return route(request)
+
+    create_upstream_client = proxy_app.create_upstream_client
+    monkeypatch.setattr(proxy_app, "create_upstream_client",
+                        lambda: create_upstream_client(httpx.MockTransport(handler)))
+    monkeypatch.setattr(proxy_app, "CURRENT_PROXY_IP", "203.0.113.7")
+    monkeypatch.setattr(proxy_app, "RESPONSE_CACHE",
+                        proxy_app.ResponseCache(proxy_app.RESPONSE_CACHE_SIZE, proxy_app.RESPONSE_CACHE_MAX_BYTES))
+    monkeypatch.setattr(proxy_app, "PREFETCH_SKIP", proxy_app.ResponseCache(proxy_app.RESPONSE_CACHE_SIZE))
+    return routes, seen
+
+
+@pytest.fixture(params=["hyperscan", "re"])
+def engine(request, monkeypatch):
+    """Run a test with the Hyperscan scanners and again with the pure-re
+    fallbacks that deployments without hyperscan use"""
+    if request.param == "hyperscan":
+        if not proxy_app.HYPERSCAN_SUPPORT:
+            pytest.skip("hyperscan not installed")
+    else:
+        monkeypatch.setattr(proxy_app, "REWRITE_DB", None)
+        monkeypatch.setattr(proxy_app, "SCRUB_DB", None)
+    return request.param
+
+
+@pytest.fixture
+def client(upstream):
+    with TestClient(proxy_app.app) as client:
+        yield client
+
+
+def finish_prefetches(client):
+    """Let the sub-resource fetches started by the last page run to completion"""
+    async def drain():
+        while proxy_app.PREFETCH_TASKS:
+            await asyncio.gather(*proxy_app.PREFETCH_TASKS, return_exceptions=True)
+    client.portal.call(drain)
+
+
+def test_upstream_cookies_do_not_carry_over(client, upstream):
+    routes, seen = upstream
+    routes["/login"] = lambda request: httpx.Response(
+        200, text="ok", headers={"set-cookie": "session=alice; Path=/"})
+    routes["/account"] = lambda request: httpx.Response(200, text="ok")
+
+    assert client.get("/proxy/https://example.com/login").status_code == 200
+    assert client.get("/proxy/https://example.com/account").status_code == 200
+
+    assert [request.url.path for request in seen] == ["/login", "/account"]
+    assert "cookie" not in seen[1].headers
+
+
+def test_redirect_keeps_query_string(client, upstream):
+    routes, seen = upstream
+    routes["/find"] = lambda request: httpx.Response(
+        302, headers={"location": "/search?q=hello&page=2"})
+    routes["/search"] = lambda request: httpx.Response(200, text=f"results for {request.url.query.decode()}")
+
+    response = client.get("/proxy/https://example.com/find")
+
+    assert response.status_code == 200
+    assert response.text == "results for q=hello&page=2"
+    assert str(seen[-1].url) == "https://example.com/search?q=hello&page=2"
+
+
+def test_prefetched_script_is_fetched_once(client, upstream):
+    routes, seen = upstream
+    routes["/page"] = lambda request: httpx.Response(
+        200, html='<html><head></head><body><script src="/app.js?v=42&amp;m=1#top"></script></body></html>')
+    routes["/app.js"] = lambda request: httpx.Response(
+        200, content=b"console.log(42)", headers={"content-type": "application/javascript"})
+
+    client.get("/proxy/https://example.com/page")
+    finish_prefetches(client)
+    response = client.get("/proxy/https://example.com/app.js?v=42&m=1")
+
+    assert response.content == b"console.log(42)"
+    assert [str(request.url) for request in seen if request.url.path == "/app.js"] == [
+        "https://example.com/app.js?v=42&m=1"]
+
+
+def test_streamed_only_script_is_not_prefetched_again(client, upstream):
+    routes, seen = upstream
+    routes["/page"] = lambda request: httpx.Response(
+        200, html='<html><head></head><body><script src="/live.js"></script></body></html>',
+        headers={"cache-control": "no-store"})
+    routes["/live.js"] = lambda request: httpx.Response(
+        200, content=b"tick()", headers={"content-type": "application/javascript", "cache-control": "no-store"})
+
+    for _ in range(2):
+        client.get("/proxy/https://example.com/page")
+        finish_prefetches(client)
+
+    assert [request.url.path for request in seen].count("/live.js") == 1
+
+
+def test_json_viewer_is_not_shared_with_script_requests(client, upstream):
+    routes, seen = upstream
+
+    async def slow_api(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"ok": True})
+    routes["/api"] = slow_api
+
+    async def navigate_and_fetch():
+        # The XHR arrives while the navigation's fetch is still in flight
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=proxy_app.app),
+                                     base_url="http://testserver") as browser:
+            return await asyncio.gather(
+                browser.get("/proxy/https://example.com/api", headers={"accept": "text/html"}),
+                browser.get("/proxy/https://example.com/api", headers={"accept": "application/json"}),
+            )
+
+    page, xhr = client.portal.call(navigate_and_fetch)
+
+    assert "<pre>" in page.text
+    assert xhr.json() == {"ok": True}
+
+
+INVALID_TARGETS = ["https://[::1", "http://%5B::1/x", "javascript:alert(1)", "javascript:1", "https://example.com:99999/"]
+
+
+@pytest.mark.parametrize("target", INVALID_TARGETS)
+def test_unsupported_urls_are_rejected_before_fetching(client, upstream, target):
+    routes, seen = upstream
+
+    response = client.get(f"/proxy/{target}")
+
+    assert response.status_code == 400
+    assert seen == []
+
+
+@pytest.mark.parametrize("target", INVALID_TARGETS)
+def test_proxy_first_rejects_unsupported_candidates(client, upstream, target):
+    routes, seen = upstream
+    routes["/"] = lambda request: httpx.Response(200, text="ok")
+
+    response = client.get("/proxy-first", params=[("url", "https://example.com/"), ("url", target)])
+
+    assert response.status_code == 400
+    assert seen == []
+
+
+@pytest.mark.parametrize("target, expected", [
+    ("example.com/page", "https://example.com/page"),
+    ("example.com:8080/x", "https://example.com:8080/x"),
+    ("localhost:8080/x", "https://localhost:8080/x"),
+    ("http://example.com/a", "http://example.com/a"),
+])
+def test_bare_hosts_default_to_https(target, expected):
+    assert proxy_app.normalize_target_url(target) == expected
+
+
+def test_response_cache_evicts_to_stay_within_byte_budget():
+    cache = proxy_app.ResponseCache(maxsize=10, maxbytes=100)
+    cache.set("a", "A", ttl=60, size=40)
+    cache.set("b", "B", ttl=60, size=40)
+    cache.get("a")
+    cache.set("c", "C", ttl=60, size=40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.nbytes == 80
+
+    cache.set("a", "A2", ttl=60, size=10)
+    assert cache.nbytes == 50
+
+
+def test_restarting_the_app_does_not_duplicate_log_handlers(upstream):
+    for _ in range(2):
+        with TestClient(proxy_app.app):
+            assert len(proxy_app.logger.handlers) == 1
+    assert proxy_app.logger.handlers == []
+
+
+def test_streamed_page_gets_the_scripts_once_when_head_is_past_the_buffer(client, upstream, engine):
+    routes, seen = upstream
+    filler = b"<!-- filler -->" * (proxy_app.RESPONSE_CACHE_MAX_BODY // 15 + 1)
+
+    async def chunks():
+        yield b'<html lang="en">' + filler
+        yield b"<head><title>t</title></head><body>big</body></html>"
+    routes["/big"] = lambda request: httpx.Response(
+        200, content=chunks(), headers={"content-type": "text/html; charset=utf-8"})
+
+    response = client.get("/proxy/https://example.com/big")
+
+    assert response.status_code == 200
+    assert response.text.count(proxy_app.get_ip_blocking_script("203.0.113.7").decode()) == 1
+    assert response.text.endswith("<body>big</body></html>")
+
+
+@pytest.mark.parametrize("vary, cached", [
+    (None, True),
+    ("Accept-Encoding", True),
+    ("Accept", False),
+    ("accept-encoding, User-Agent", False),
+    ("*", False),
+])
+def test_responses_negotiated_on_more_than_encoding_are_not_cached(client, upstream, vary, cached):
+    routes, seen = upstream
+    headers = {"content-type": "image/webp"}
+    if vary:
+        headers["vary"] = vary
+    routes["/img"] = lambda request: httpx.Response(200, content=b"RIFF....WEBP", headers=headers)
+
+    for _ in range(2):
+        assert client.get("/proxy/https://example.com/img").content == b"RIFF....WEBP"
+
+    assert len(seen) == (1 if cached else 2)
+
+
+def test_stylesheet_urls_are_resolved_against_the_stylesheet(client, upstream):
+    routes, seen = upstream
+    routes["/css/site.css"] = lambda request: httpx.Response(200, content=(
+        b"a{background:url(/img/root.png)}"
+        b"b{background:url('../img/rel.png')}"
+        b"c{background:url(\"https://cdn.example.net/abs.png\")}"
+        b"d{background:url(data:image/png;base64,AAAA)}"
+        b"e{filter:url(#glow)}"
+        b"f{background:url(//cdn.example.net/proto.png)}"
+    ), headers={"content-type": "text/css"})
+
+    css = client.get("/proxy/https://example.com/css/site.css").text
+
+    base = "https://testserver/proxy/"
+    assert f'url("{base}https://example.com/img/root.png")' in css
+    assert f'url("{base}https://example.com/img/rel.png")' in css
+    assert f'url("{base}https://cdn.example.net/abs.png")' in css
+    assert "url(data:image/png;base64,AAAA)" in css
+    assert "url(#glow)" in css
+    assert f'url("{base}https://cdn.example.net/proto.png")' in css
+
+
+def test_already_proxied_css_urls_are_left_alone():
+    proxy_base = b"https://testserver/proxy"
+    url = proxy_base + b"/https://example.com/a.png"
+    assert proxy_app.rewrite_css_url(url, "https://example.com/site.css", b"https://example.com", proxy_base) is None
+
+
+def test_scrub_html_replaces_ips_and_locations(engine):
+    page = (b"<p>Your IP 10.0.0.1 / 2001:db8:0:0:0:0:0:1 in Bhubaneswar, India"
+            b" (Bharti Airtel Limited, AS45609)</p><p>version 1.2.3</p>")
+
+    assert proxy_app.scrub_html(page, "203.0.113.7") == (
+        b"<p>Your IP 203.0.113.7 / 203.0.113.7 in New York, United States"
+        b" (DigitalOcean, LLC, AS14061)</p><p>version 1.2.3</p>")
+
+
+def test_scrub_html_returns_clean_pages_unchanged(engine):
+    page = b"<p>Nothing to see, v1.2 here</p>"
+    assert proxy_app.scrub_html(page, "203.0.113.7") is page
+
+
+def test_rewrite_html_only_touches_candidate_attributes(engine):
+    page = b'<a HREF = "/x">x</a><a href="https://other.example/y">y</a><p>src is /z</p><img src=/w.png>'
+
+    rewritten = proxy_app.rewrite_html(page, lambda m: b"[" + m.group(0) + b"]")
+
+    assert rewritten == b'<a [HREF = "/x"]>x</a><a href="https://other.example/y">y</a><p>src is /z</p><img [src=/w.png]>'
+
+
+def test_page_urls_are_rewritten_and_scripts_follow_head_with_attributes(client, upstream, engine):
+    routes, seen = upstream
+    routes["/page"] = lambda request: httpx.Response(200, html=(
+        '<HTML lang="en"><HEAD data-x="1"><link HREF = "/a.css"></HEAD><body>'
+        '<img src=/b.png srcset="/c.png 1x, /d.png 2x">'
+        '<a href="//cdn.example.net/e">e</a><a href="https://other.example/f">f</a>'
+        '</body></HTML>'))
+
+    page = client.get("/proxy/https://example.com/page").text
+
+    base = "https://testserver/proxy/"
+    inject = proxy_app.get_head_inject("203.0.113.7", False, False).decode()
+    assert page.count(inject) == 1
+    assert '<HEAD data-x="1">' + inject in page
+    assert f'"{base}https://example.com/a.css"' in page
+    assert f"src={base}https://example.com/b.png" in page
+    assert f'srcset="{base}https://example.com/c.png 1x, {base}https://example.com/d.png 2x"' in page
+    assert f'"{base}https://cdn.example.net/e"' in page
+    assert 'href="https://other.example/f"' in page
+
+
+@pytest.mark.parametrize("html, expected_prefix", [
+    ('<html data-theme="dark"><body>x</body></html>', '<html data-theme="dark"><head>{script}</head><body>x'),
+    ("<p>fragment</p>", "<html><head>{script}</head><body><p>fragment</p></body></html>"),
+])
+def test_pages_without_head_get_one_spliced_in(client, upstream, engine, html, expected_prefix):
+    routes, seen = upstream
+    routes["/page"] = lambda request: httpx.Response(200, html=html)
+
+    page = client.get("/proxy/https://example.com/page").text
+
+    script = proxy_app.get_ip_blocking_script("203.0.113.7").decode()
+    assert page.startswith(expected_prefix.format(script=script))
+
+
+def test_proxy_first_serves_the_first_successful_candidate(client, upstream):
+    routes, seen = upstream
+    routes["/down"] = lambda request: httpx.Response(500, text="down")
+    routes["/up"] = lambda request: httpx.Response(200, text="up")
+
+    response = client.get("/proxy-first", params=[("url", "https://example.com/down"), ("url", "https://example.com/up")])
+
+    assert response.status_code == 200
+    assert response.text == "up"
+
+
+def test_proxy_first_reports_when_no_candidate_answers(client, upstream):
+    routes, seen = upstream
+    routes["/down"] = lambda request: httpx.Response(500, text="down")
+
+    response = client.get("/proxy-first", params=[("url", "https://example.com/down")])
+
+    assert response.status_code == 502
+    assert "https://example.com/down answered 500" in response.text